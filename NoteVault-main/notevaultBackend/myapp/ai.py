@@ -0,0 +1,247 @@
+"""
+Text-intelligence pipelines behind the summarize and grammar-check views.
+
+A pipeline is a generator over the user's text: it yields each `Prompt` it
+needs answered, is sent back the model's reply text, and finally returns a
+`(payload, status_code)` pair for the view to send back. Keeping the model
+calls out of the pipelines lets the same logic run under the blocking
+driver (`run`) used by the WSGI views and the asyncio driver (`arun`) used
+by the async views, which bounds in-flight calls with a semaphore and puts
+a timeout on each of them. Providers in `myapp.providers` decide which
+model runs the pipelines and cache their results.
+
+The grammar check has two modes, chosen by `settings.CHECK_TEXT_PIPELINE`:
+"structured" asks for every verdict and the corrected text in a single
+JSON-schema call, "chain" is the original sequence of up to four yes/no
+prompts. The structured mode falls back to the chain whenever the model's
+answer cannot be parsed.
+"""
+import asyncio
+import json
+import logging
+import weakref
+from collections import namedtuple
+
+from django.conf import settings
+from rest_framework import status
+
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+Prompt = namedtuple('Prompt', ['text', 'options'])
+
+
+class ModelBusy(Exception):
+    """No slot for another in-flight model call freed up in time."""
+
+
+class ModelTimeout(Exception):
+    """A model call took longer than settings.AI_CALL_TIMEOUT."""
+
+
+def ask(text, **options):
+    return Prompt(text, options)
+
+CHECK_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'makes_sense': {'type': 'boolean'},
+        'correctable': {'type': 'boolean'},
+        'is_correct': {'type': 'boolean'},
+        'corrected_text': {'type': 'string'},
+    },
+    'required': ['makes_sense', 'correctable', 'is_correct', 'corrected_text'],
+}
+
+CHECK_PROMPT = (
+    "Review the text below and answer in JSON.\n"
+    "- makes_sense: does the text make sense?\n"
+    "- correctable: if it does not make sense, can it be corrected to make sense?\n"
+    "- is_correct: is the text grammatically and punctually correct?\n"
+    "- corrected_text: the text with grammar, punctuation and spelling corrected "
+    "(the original text if nothing needs fixing).\n"
+    "Text: {text}"
+)
+
+
+def summarize(original_text):
+    analysis_response = yield ask(
+        f"Does the following text convey meaning, even if it contains grammar or spelling errors? Answer 'yes' or 'no': {original_text}"
+    )
+    if "no" in analysis_response.lower():
+        correction_check = yield ask(
+            f"Can the following text be corrected to make sense? Answer 'yes' or 'no': {original_text}"
+        )
+        if "no" in correction_check.lower():
+            return (
+                {'message': 'The provided text cannot be summarized meaningfully. Please provide coherent text.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+    if " I " in original_text or original_text.lower().startswith("i "):
+        summary_prompt = (
+            f"Act as a professional summarizer. Retain the first-person perspective while condensing: {original_text}"
+        )
+    else:
+        summary_prompt = (
+            f"Act as a professional summarizer. Condense the following text while retaining its essence and correcting grammar and spelling: {original_text}"
+        )
+
+    response = yield ask(summary_prompt)
+    summary = response.strip()
+    if not summary or summary.lower() == original_text.lower() or len(summary) < 3:
+        return (
+            {'message': 'The summarization failed to produce meaningful output. Please provide valid and coherent text.'},
+            status.HTTP_400_BAD_REQUEST
+        )
+    return {'summary': summary}, status.HTTP_200_OK
+
+
+def check(original_text):
+    if getattr(settings, 'CHECK_TEXT_PIPELINE', 'structured') == 'chain':
+        return (yield from check_chain(original_text))
+    return (yield from check_structured(original_text))
+
+
+def check_structured(original_text):
+    try:
+        response = yield ask(
+            CHECK_PROMPT.format(text=original_text),
+            generation_config={'response_mime_type': 'application/json', 'response_schema': CHECK_SCHEMA},
+        )
+        verdict = parse_check_verdict(response)
+    except ValueError:
+        # Raised by the SDK when the answer was blocked or has no text.
+        verdict = None
+    if verdict is None:
+        logger.warning('Structured grammar check returned an unusable answer, falling back to the chain')
+        return (yield from check_chain(original_text))
+
+    if not verdict['makes_sense'] and not verdict['correctable']:
+        return (
+            {'message': 'The provided text is nonsensical or invalid. Please provide meaningful input.'},
+            status.HTTP_400_BAD_REQUEST
+        )
+    if verdict['is_correct']:
+        return {'message': 'No fix required!'}, status.HTTP_200_OK
+    corrected_text = verdict['corrected_text']
+    if not corrected_text.endswith("."):
+        corrected_text += "."
+    return {'correctedText': corrected_text}, status.HTTP_200_OK
+
+
+def parse_check_verdict(text):
+    """
+    Parse the structured grammar-check answer. Returns None unless every
+    field is present with the right type and the corrected text is usable.
+    """
+    text = (text or '').strip()
+    if text.startswith('```'):
+        # Some models wrap JSON in a Markdown code fence despite the mime type.
+        text = text.strip('`').strip()
+        if text.lower().startswith('json'):
+            text = text[4:]
+    try:
+        verdict = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(verdict, dict):
+        return None
+    for field in ('makes_sense', 'correctable', 'is_correct'):
+        if not isinstance(verdict.get(field), bool):
+            return None
+    corrected_text = verdict.get('corrected_text')
+    if not isinstance(corrected_text, str):
+        return None
+    verdict['corrected_text'] = corrected_text.strip()
+    if not verdict['is_correct'] and not verdict['corrected_text']:
+        return None
+    return verdict
+
+
+def check_chain(original_text):
+    sense_check_response = yield ask(f"Does this text make sense? Answer 'yes' or 'no': {original_text}")
+    if "no" in sense_check_response.lower():
+        grammar_check_response = yield ask(f"Can this text be corrected to make sense? Answer 'yes' or 'no': {original_text}")
+        if "no" in grammar_check_response.lower():
+            return (
+                {'message': 'The provided text is nonsensical or invalid. Please provide meaningful input.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+    correctness_response = yield ask(f"Is this text grammatically and punctually correct? Answer 'yes' or 'no': {original_text}")
+    if "yes" in correctness_response.lower():
+        return {'message': 'No fix required!'}, status.HTTP_200_OK
+    correction_response = yield ask(f"Correct grammar, punctuation, and spelling: {original_text}")
+    corrected_text = correction_response.strip()
+    if not corrected_text.endswith("."):
+        corrected_text += "."
+    return {'correctedText': corrected_text}, status.HTTP_200_OK
+
+
+def run(pipeline, model, original_text):
+    steps = pipeline(original_text)
+    resume, reply = steps.send, None
+    while True:
+        try:
+            prompt = resume(reply)
+        except StopIteration as done:
+            return done.value
+        try:
+            with timed('external'):
+                reply, resume = model.generate_content(prompt.text, **prompt.options).text, steps.send
+        except ValueError as exc:
+            reply, resume = exc, steps.throw
+
+
+async def arun(pipeline, model, original_text):
+    steps = pipeline(original_text)
+    resume, reply = steps.send, None
+    while True:
+        try:
+            prompt = resume(reply)
+        except StopIteration as done:
+            return done.value
+        try:
+            reply, resume = await call_model_async(model, prompt), steps.send
+        except ValueError as exc:
+            reply, resume = exc, steps.throw
+
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore():
+    # asyncio primitives belong to one event loop, so keep one per loop.
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.BoundedSemaphore(settings.AI_MAX_CONCURRENCY)
+    return semaphore
+
+
+async def call_model_async(model, prompt):
+    """
+    Make one model call while holding a concurrency slot. Waiting for a
+    slot and the call itself are each limited to settings.AI_CALL_TIMEOUT.
+    If the request is cancelled (the client disconnected) the call is
+    cancelled with it and the slot is released.
+    """
+    timeout = settings.AI_CALL_TIMEOUT
+    semaphore = _get_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise ModelBusy()
+    try:
+        if hasattr(model, 'generate_content_async'):
+            call = model.generate_content_async(prompt.text, **prompt.options)
+        else:
+            call = asyncio.to_thread(model.generate_content, prompt.text, **prompt.options)
+        with timed('external'):
+            response = await asyncio.wait_for(call, timeout)
+    except asyncio.TimeoutError:
+        raise ModelTimeout()
+    finally:
+        semaphore.release()
+    return response.text
+
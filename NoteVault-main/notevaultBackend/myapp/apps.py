@@ -4,3 +4,28 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from . import dbpool
+        dbpool.install()
+
+        # Registers the RATE_LIMITS system check.
+        from . import ratelimit
+
+        # Time DB queries on every thread's connections, not just the caller's.
+        from django.db.backends.signals import connection_created
+        from .instrumentation import install_query_timer
+        connection_created.connect(install_query_timer)
+
+        # Keep cached principals in step with user changes and deletions.
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+        from .authentication import forget_saved_user
+        post_save.connect(forget_saved_user, sender=get_user_model())
+        post_delete.connect(forget_saved_user, sender=get_user_model())
+
+        # Renew a user's cached category list whenever a category changes.
+        from .categories import forget_saved_category
+        from .models import Category
+        post_save.connect(forget_saved_category, sender=Category)
+        post_delete.connect(forget_saved_category, sender=Category)
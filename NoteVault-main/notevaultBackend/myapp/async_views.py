@@ -0,0 +1,72 @@
+"""
+Async versions of the AI endpoints, for deployments served through
+`notevaultBackend/asgi.py` (e.g. `uvicorn notevaultBackend.asgi:application`).
+
+While a model call is in flight these views only hold an event-loop task,
+not a worker thread, so slow model responses cannot starve CRUD traffic.
+In-flight calls are bounded by settings.AI_MAX_CONCURRENCY and each call is
+limited to settings.AI_CALL_TIMEOUT. When the client disconnects Django
+cancels the view, which cancels the pending model call. Clients are
+identified by their JWT as in the DRF views, so both share a client's `ai`
+rate-limit bucket.
+
+DRF's @api_view does not support coroutines, so these are plain Django
+views that mirror the request and response shapes of the DRF ones.
+"""
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+
+from . import ai
+from .providers import get_provider
+from .ratelimit import take_for_request
+
+
+def _read_text(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data.get('text') if isinstance(data, dict) else None
+    return request.POST.get('text')
+
+
+async def _run(request, operation):
+    # Token checks and the shared bucket store block; keep them off the event loop.
+    wait = await sync_to_async(take_for_request)('ai', request)
+    if wait:
+        wait = math.ceil(wait)
+        response = JsonResponse({'detail': 'Request was throttled. Expected available in %d seconds.' % wait},
+                                status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(wait)
+        return response
+    original_text = _read_text(request)
+    if not original_text or not isinstance(original_text, str) or len(original_text.strip()) == 0:
+        return JsonResponse({'error': 'Input text is empty or invalid.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        data, code = await get_provider().arun(operation, original_text)
+    except ai.ModelBusy:
+        return JsonResponse({'error': 'The AI service is busy. Please try again.'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except ai.ModelTimeout:
+        return JsonResponse({'error': 'The AI service timed out. Please try again.'},
+                            status=status.HTTP_504_GATEWAY_TIMEOUT)
+    return JsonResponse(data, status=code)
+
+
+@csrf_exempt
+@require_POST
+async def summarize_text(request):
+    return await _run(request, 'summarize')
+
+
+@csrf_exempt
+@require_POST
+async def check_text(request):
+    return await _run(request, 'check')
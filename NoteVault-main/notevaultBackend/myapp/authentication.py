@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import TieredCache
+from .instrumentation import timed
+
+# Field values of recently authenticated users, by user id.
+principal_cache = TieredCache.from_settings('principals', 'PRINCIPAL_CACHE', MAXSIZE=10000, TTL=60)
+
+# Only what the views and permission checks read from request.user; other
+# fields load on access. The password hash is never cached, only its digest
+# as used by CHECK_REVOKE_TOKEN.
+CACHED_FIELDS = ('username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _fields():
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.primary_key or field.attname in CACHED_FIELDS
+    ]
+
+
+def principal_key(user_id):
+    """
+    Cache key of the user's entry, under the user's generation: with a shared
+    tier, `forget_user` makes every worker miss at once instead of serving
+    its local copy until LOCAL_TTL.
+    """
+    return '%s:%s' % (user_id, principal_cache.generation(user_id))
+
+
+def cached_principal(user_id):
+    """(user, password digest) from the cache, or (None, None)."""
+    entry = principal_cache.get(principal_key(user_id))
+    if entry is None:
+        return None, None
+    values, revoke_marker = entry
+    # A fresh instance per request, so views can modify request.user freely.
+    # Its other fields are deferred: save() writes only the loaded ones, so
+    # views pass update_fields to write just what they changed.
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, _fields(), values), revoke_marker
+
+
+def cached_user(user_id):
+    return cached_principal(user_id)[0]
+
+
+def remember_user(user):
+    values = [getattr(user, name) for name in _fields()]
+    principal_cache.set(principal_key(user.pk), (values, get_md5_hash_password(user.password)))
+
+
+def forget_user(user_id):
+    principal_cache.new_generation(user_id)
+    # Again once committed, so a row read before the commit is not kept.
+    transaction.on_commit(lambda: principal_cache.new_generation(user_id))
+
+
+def forget_saved_user(sender, instance, **kwargs):
+    """post_save/post_delete receiver for the user model."""
+    forget_user(instance.pk)
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that reports its duration to request instrumentation."""
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+
+class CachedJWTAuthentication(TimedJWTAuthentication):
+    """
+    Resolves the user of a verified token through a short-lived per-process
+    cache (optionally shared) instead of querying the database on every
+    request. Saving or deleting a user (deactivation, password change)
+    renews its generation; with a shared tier every worker misses at once,
+    otherwise other workers' local copies live at most
+    PRINCIPAL_CACHE['LOCAL_TTL'] seconds. Cached inactive users are
+    rejected like simplejwt rejects them.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user, revoke_marker = cached_principal(user_id) if user_id is not None else (None, None)
+        if user is None or (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revoke_marker
+        ):
+            # Unknown user or possibly stale entry: check against the database.
+            user = super().get_user(validated_token)
+            remember_user(user)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
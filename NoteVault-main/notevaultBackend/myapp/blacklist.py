@@ -0,0 +1,206 @@
+"""
+Refresh-token blacklist with an in-memory Bloom filter in front.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every `/refresh/`
+blacklists the token it consumed (simplejwt's `token_blacklist` app), and
+every refresh token presented is checked against that blacklist. Most
+presented tokens are not blacklisted, so `blacklist_filter` keeps a Bloom
+filter of the unexpired blacklisted jtis: a jti the filter has not seen is
+accepted without a query, and only possible members (including the
+filter's rare false positives) are confirmed against the database.
+
+A background thread keeps the filter in step with the database. Every
+SYNC_INTERVAL seconds it adds the tokens blacklisted since the last sync
+by any worker; every REBUILD_INTERVAL seconds it rebuilds the filter from
+the unexpired entries and deletes the expired ones from the database.
+Tokens blacklisted in this process are added at once, while one
+blacklisted by another worker may be accepted here for up to SYNC_INTERVAL
+seconds. Until the first sync has finished every check goes to the
+database.
+"""
+import collections
+import datetime
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import cached_user, remember_user
+
+logger = logging.getLogger(__name__)
+
+# Overlap between incremental syncs, for rows committed out of order.
+SYNC_OVERLAP = datetime.timedelta(minutes=1)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class BlacklistFilter:
+    def __init__(self, capacity, error_rate, sync_interval, rebuild_interval, background=True):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.background = background
+        self.filter = None
+        self.synced_at = None
+        self.rebuilt_at = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._added_during_rebuild = collections.deque()
+        self._last_sync = 0.0
+        self._thread = None
+
+    def might_contain(self, jti):
+        self._keep_fresh()
+        current = self.filter
+        return current is None or jti in current
+
+    def add(self, jti):
+        with self._lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+            if self._rebuilding:
+                self._added_during_rebuild.append(jti)
+
+    def sync(self):
+        now = timezone.now()
+        self._last_sync = time.monotonic()
+        if self.filter is None or time.monotonic() - self.rebuilt_at >= self.rebuild_interval:
+            self.rebuild(now)
+            return
+        new = BlacklistedToken.objects.filter(blacklisted_at__gte=self.synced_at - SYNC_OVERLAP)
+        jtis = list(new.values_list('token__jti', flat=True))
+        with self._lock:
+            for jti in jtis:
+                self.filter.add(jti)
+        self.synced_at = now
+
+    def rebuild(self, now):
+        # Expired tokens can no longer be presented; drop them everywhere.
+        OutstandingToken.objects.filter(expires_at__lte=now).delete()
+        with self._lock:
+            self._rebuilding = True
+        try:
+            fresh = BloomFilter(self.capacity, self.error_rate)
+            unexpired = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            for jti in unexpired.values_list('token__jti', flat=True).iterator(chunk_size=10000):
+                fresh.add(jti)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+                added, self._added_during_rebuild = self._added_during_rebuild, collections.deque()
+        with self._lock:
+            for jti in added:
+                fresh.add(jti)
+            self.filter = fresh
+        self.synced_at = now
+        self.rebuilt_at = time.monotonic()
+
+    def _keep_fresh(self):
+        if not self.background:
+            if time.monotonic() - self._last_sync >= self.sync_interval:
+                self.sync()
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='token-blacklist-sync', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            close_old_connections()
+            try:
+                self.sync()
+            except Exception:
+                logger.exception('Token blacklist sync failed')
+            time.sleep(self.sync_interval)
+
+
+blacklist_filter = BlacklistFilter(
+    capacity=settings.TOKEN_BLACKLIST_FILTER['CAPACITY'],
+    error_rate=settings.TOKEN_BLACKLIST_FILTER['ERROR_RATE'],
+    sync_interval=settings.TOKEN_BLACKLIST_FILTER['SYNC_INTERVAL'],
+    rebuild_interval=settings.TOKEN_BLACKLIST_FILTER['REBUILD_INTERVAL'],
+    background=settings.TOKEN_BLACKLIST_FILTER['BACKGROUND'],
+)
+
+
+class FilteredRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check consults `blacklist_filter` first."""
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    """
+    simplejwt's refresh serializer with the filtered blacklist check and the
+    token's user resolved through the principal cache.
+    """
+    token_class = FilteredRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user = cached_user(user_id)
+            if user is None:
+                user_model = get_user_model()
+                try:
+                    user = user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+                except user_model.DoesNotExist:
+                    raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+                remember_user(user)
+            if not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
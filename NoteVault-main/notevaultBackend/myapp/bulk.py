@@ -0,0 +1,150 @@
+"""
+Batch note operations for `/notes/bulk/`.
+
+All operations in a request are validated together against one query for
+the referenced notes and one for the referenced categories, then applied in
+a single transaction with `bulk_create`, `bulk_update` and one filtered
+delete. If any operation is invalid, nothing is applied.
+
+Supported operations (`op`):
+- `create`: `title`, `content`, `category`, optional `pinned`, `font_size`, `font_style`
+- `update`: `id` plus any of `title`, `content`, `category`, `pinned`, `font_size`, `font_style`
+- `pin`:    `id`, `pinned`
+- `move`:   `id`, `category`
+- `delete`: `id`
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import revisions, search, sync
+from .models import Category, ChangeCounter, Note, Tombstone
+
+OPERATIONS = ('create', 'update', 'pin', 'move', 'delete')
+EDITABLE_FIELDS = ('title', 'content', 'category', 'pinned', 'font_size', 'font_style')
+REQUIRED_FIELDS = {
+    'create': ('title', 'content', 'category'),
+    'update': (),
+    'pin': ('pinned',),
+    'move': ('category',),
+    'delete': (),
+}
+ALLOWED_FIELDS = {
+    'create': EDITABLE_FIELDS,
+    'update': EDITABLE_FIELDS,
+    'pin': ('pinned',),
+    'move': ('category',),
+    'delete': (),
+}
+
+
+class BulkValidationError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _clean_value(field, value, categories):
+    if field in ('title', 'font_style'):
+        if not isinstance(value, str) or not value.strip() or len(value) > 255:
+            raise ValueError(f'`{field}` must be a non-empty string of at most 255 characters')
+        return value
+    if field == 'content':
+        if not isinstance(value, str) or not value:
+            raise ValueError('`content` must be a non-empty string')
+        return value
+    if field == 'pinned':
+        if not isinstance(value, bool):
+            raise ValueError('`pinned` must be true or false')
+        return value
+    if field == 'font_size':
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            raise ValueError('`font_size` must be a positive integer')
+        return value
+    if field == 'category':
+        if value not in categories:
+            raise ValueError('Invalid category')
+        return value
+
+
+def _validate(user, operations):
+    note_ids = {op.get('id') for op in operations if isinstance(op, dict) and op.get('op') != 'create'}
+    category_ids = {op.get('category') for op in operations if isinstance(op, dict) and 'category' in op}
+    notes = Note.objects.filter(user=user).in_bulk([i for i in note_ids if isinstance(i, int)])
+    categories = set(
+        Category.objects.filter(user=user, id__in=[i for i in category_ids if isinstance(i, int)])
+        .values_list('id', flat=True)
+    )
+
+    cleaned, errors, targeted = [], [], set()
+    for index, operation in enumerate(operations):
+        try:
+            if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+                raise ValueError('`op` must be one of: ' + ', '.join(OPERATIONS))
+            kind = operation['op']
+            missing = [field for field in REQUIRED_FIELDS[kind] if field not in operation]
+            if missing:
+                raise ValueError('Missing fields: ' + ', '.join(missing))
+            note = None
+            if kind != 'create':
+                note = notes.get(operation.get('id'))
+                if note is None:
+                    raise ValueError('Note not found')
+                if note.pk in targeted:
+                    raise ValueError('Note is targeted by more than one operation')
+                targeted.add(note.pk)
+            values = {
+                field: _clean_value(field, operation[field], categories)
+                for field in ALLOWED_FIELDS[kind] if field in operation
+            }
+            cleaned.append((index, kind, note, values))
+        except ValueError as exc:
+            errors.append({'index': index, 'error': str(exc)})
+    if errors:
+        raise BulkValidationError(errors)
+    return cleaned
+
+
+def apply_operations(user, operations):
+    """
+    Validate and apply the operations. Returns one result per operation, in
+    request order, as `(index, op, note_or_id)`; raises BulkValidationError
+    without touching the database if any operation is invalid.
+    """
+    cleaned = _validate(user, operations)
+    now = timezone.now()
+    to_create, to_update, to_delete, results = [], [], [], []
+    update_fields, previous = set(), {}
+    for index, kind, note, values in cleaned:
+        if 'category' in values:
+            values['category_id'] = values.pop('category')
+        if kind == 'create':
+            note = Note(user=user, **values)
+            to_create.append(note)
+        elif kind == 'delete':
+            to_delete.append(note.pk)
+        else:
+            previous[note.pk] = note.content
+            for field, value in values.items():
+                setattr(note, field, value)
+            update_fields.update(values)
+            to_update.append(note)
+        results.append((index, kind, note.pk if kind == 'delete' else note))
+
+    with transaction.atomic():
+        written = to_create + to_update
+        if written:
+            first = ChangeCounter.allocate(user.id, len(written))
+            for offset, note in enumerate(written):
+                note.seq = first + offset
+                note.updated_at = now
+        if to_create:
+            Note.objects.bulk_create(to_create, batch_size=500)
+        if to_update:
+            Note.objects.bulk_update(to_update, sorted(update_fields | {'seq', 'updated_at'}), batch_size=500)
+        if to_delete:
+            search.remove_notes(to_delete)
+            sync.record_deletions(user.id, Tombstone.NOTE, to_delete)
+            Note.objects.filter(user=user, id__in=to_delete).delete()
+        search.index_notes(written)
+        revisions.record(written, previous)
+    return results
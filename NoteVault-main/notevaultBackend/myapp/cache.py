@@ -0,0 +1,205 @@
+"""
+Small caching toolkit shared by the app.
+
+`LRUCache` is a thread-safe, size-bounded in-process cache with per-entry
+TTLs. `TieredCache` puts one in front of an optional shared Django cache
+(any backend configured in `settings.CACHES`, e.g. Redis or memcached) so
+several worker processes can share entries, and keeps hit/miss counters for
+each tier.
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+_caches = []
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    def __init__(self, name, maxsize=1024, ttl=None, shared_alias=None, local_ttl=None):
+        # `local_ttl` can be shorter than `ttl` to bound how long a worker
+        # may serve an entry another worker has since replaced or deleted.
+        self.name = name
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=local_ttl or ttl)
+        self.shared_alias = shared_alias
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        _caches.append(self)
+
+    @classmethod
+    def from_settings(cls, name, setting, **defaults):
+        """
+        Build a cache from a settings dict such as
+        `{'MAXSIZE': 1024, 'TTL': 300, 'SHARED_ALIAS': 'default', 'LOCAL_TTL': 10}`.
+        """
+        options = dict(defaults, **getattr(settings, setting, {}))
+        return cls(
+            name,
+            maxsize=options.get('MAXSIZE', 1024),
+            ttl=options.get('TTL'),
+            shared_alias=options.get('SHARED_ALIAS'),
+            local_ttl=options.get('LOCAL_TTL'),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _shared_key(self, key):
+        return '%s:%s' % (self.name, key)
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            value = self.shared.get(self._shared_key(key), _MISSING)
+            if value is not _MISSING:
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+        self.misses += 1
+        return default
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, timeout=self.ttl)
+
+    async def aget(self, key, default=None):
+        """`get` for async code: the shared tier is read without blocking the event loop."""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            value = await self.shared.aget(self._shared_key(key), _MISSING)
+            if value is not _MISSING:
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+        self.misses += 1
+        return default
+
+    async def aset(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            await self.shared.aset(self._shared_key(key), value, timeout=self.ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+
+    def generation(self, key):
+        """
+        Token to cache `key`'s data under, e.g. `'%s:%s' % (key, token)`. With a
+        shared tier every worker sees the same token, so `new_generation` makes
+        them all miss at once; without one it is renewed at least every TTL.
+        A lost token only costs a miss.
+        """
+        key = 'generation:%s' % key
+        if self.shared is None:
+            token = self.local.get(key)
+            if token is None:
+                token = uuid.uuid4().hex
+                self.local.set(key, token)
+            return token
+        shared_key = self._shared_key(key)
+        token = self.shared.get(shared_key)
+        if token is None:
+            token = uuid.uuid4().hex
+            self.shared.add(shared_key, token, timeout=None)
+            token = self.shared.get(shared_key) or token
+        return token
+
+    def new_generation(self, key):
+        key = 'generation:%s' % key
+        token = uuid.uuid4().hex
+        if self.shared is None:
+            self.local.set(key, token)
+        else:
+            self.shared.set(self._shared_key(key), token, timeout=None)
+
+    def clear(self):
+        """Clear the local tier only; shared entries expire through their TTL."""
+        self.local.clear()
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self.local),
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
+
+
+def all_caches():
+    """Every `TieredCache` created in this process, e.g. for metrics."""
+    return list(_caches)
+
+
+def content_key(*parts):
+    """
+    Content-addressed key: a SHA-256 over the parts, with text in Unicode
+    NFC and trailing whitespace removed, so the same paragraph submitted
+    again shares an entry. Inner whitespace is kept: grammar corrections
+    mirror the input's line breaks.
+    """
+    normalized = [unicodedata.normalize('NFC', str(part)).rstrip() for part in parts]
+    return hashlib.sha256('\x00'.join(normalized).encode('utf-8')).hexdigest()
+
+
+ai_response_cache = TieredCache.from_settings('ai', 'AI_CACHE', MAXSIZE=1024, TTL=24 * 60 * 60)
@@ -0,0 +1,57 @@
+"""
+Chunked deletion of a category and its notes.
+
+`QuerySet.delete()` loads every note it deletes (to cascade to their
+search postings) and the old view did all of it in one transaction, so a
+category with tens of thousands of notes held them all in memory and
+locked them until the request timed out. `delete_category` deletes the
+notes in fixed-size chunks instead, each chunk in its own transaction
+together with its search-index removal and sync tombstones, and the
+category itself last. Only note ids are ever loaded.
+
+A run that is interrupted leaves a consistent, smaller category behind;
+deleting it again picks up where the previous run stopped.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from . import search, sync
+from .models import Note, Tombstone
+
+
+def _delete_notes(user_id, note_ids):
+    search.remove_notes(note_ids)
+    sync.record_deletions(user_id, Tombstone.NOTE, note_ids)
+    # Postings are gone, so the collector only fetches the ids.
+    Note.objects.filter(id__in=note_ids).only('id').delete()
+
+
+def delete_category(category, chunk_size=None):
+    """
+    Delete `category` and its notes, yielding a progress dict after every
+    chunk and a last one with `"done": true`.
+    """
+    chunk_size = chunk_size or settings.CATEGORY_DELETE_CHUNK_SIZE
+    user_id = category.user_id
+    notes = Note.objects.filter(user_id=user_id, category_id=category.id).order_by('id')
+    total = notes.count()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            note_ids = list(notes.values_list('id', flat=True)[:chunk_size])
+            if note_ids:
+                _delete_notes(user_id, note_ids)
+        if len(note_ids) < chunk_size:
+            break
+        deleted += len(note_ids)
+        yield {'deleted': deleted, 'total': max(total, deleted)}
+
+    with transaction.atomic():
+        # Notes written into the category since the last chunk go with it.
+        stragglers = list(notes.values_list('id', flat=True))
+        if stragglers:
+            _delete_notes(user_id, stragglers)
+        sync.record_deletions(user_id, Tombstone.CATEGORY, [category.id])
+        category.delete()
+    deleted += len(note_ids) + len(stragglers)
+    yield {'deleted': deleted, 'total': max(total, deleted), 'done': True}
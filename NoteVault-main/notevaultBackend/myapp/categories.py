@@ -0,0 +1,52 @@
+"""
+Per-user cache of category lists.
+
+Categories change rarely but are read on every page load and checked on
+every note creation. Each user's list is kept in a `TieredCache` under the
+user's category generation (see `TieredCache.generation`), which is renewed
+whenever one of their categories is saved or deleted. Note writes leave it
+alone, so autosaves do not empty the cache.
+
+With CATEGORY_CACHE['SHARED_ALIAS'] set, every worker reads the same
+generation and misses right after a change. Ownership checks are answered
+from the cached list; the foreign key still has the final say when a note
+is written.
+"""
+from django.db import transaction
+
+from .cache import TieredCache
+from .fastjson import FieldPlan
+from .models import Category
+from .serializers import CategorySerializer
+
+category_cache = TieredCache.from_settings('categories', 'CATEGORY_CACHE', MAXSIZE=10000, TTL=300)
+
+
+def user_categories(user_id):
+    """The user's categories as serialized by `CategorySerializer`, ordered by id."""
+    key = '%s:%s' % (user_id, category_cache.generation(user_id))
+    categories = category_cache.get(key)
+    if categories is None:
+        plan = FieldPlan.for_serializer(CategorySerializer)
+        categories = plan.represent(Category.objects.filter(user_id=user_id).order_by('id').values(*plan.fields))
+        category_cache.set(key, categories)
+    return categories
+
+
+def owns_category(user_id, category_id):
+    try:
+        category_id = int(category_id)
+    except (TypeError, ValueError):
+        return False
+    return any(category['id'] == category_id for category in user_categories(user_id))
+
+
+def forget_user_categories(user_id):
+    category_cache.new_generation(user_id)
+    # Again once committed, so a list read before the commit is not kept.
+    transaction.on_commit(lambda: category_cache.new_generation(user_id))
+
+
+def forget_saved_category(sender, instance, **kwargs):
+    """post_save/post_delete receiver for `Category`."""
+    forget_user_categories(instance.user_id)
@@ -0,0 +1,68 @@
+"""
+Conditional GET for the read endpoints.
+
+The ETag is derived from the user's change counter (see `ChangeCounter`),
+which moves on every note or category write and delete, plus the request
+path and response format. Checking it costs one indexed lookup, so an
+unchanged collection is answered with 304 Not Modified before any notes are
+loaded or serialized.
+"""
+import functools
+import hashlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import ChangeCounter
+
+
+def collection_etag(request):
+    version = ChangeCounter.current(request.user.id)
+    renderer = getattr(request, 'accepted_renderer', None)
+    variant = '%s|%s' % (request.get_full_path(), renderer.format if renderer else '')
+    digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:16]
+    return quote_etag('%s-%s-%s' % (request.user.id, version, digest))
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses the weak comparison: proxies and compressing
+    # middleware turn "x" into W/"x" on the way out.
+    return _opaque(etag) in {_opaque(tag) for tag in parse_etags(if_none_match)}
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def condition_on_collection_version(view=None, *, exists=None):
+    """
+    Decorate a DRF function view (below @api_view and @permission_classes,
+    so it runs after authentication) to send and honour ETags.
+
+    Detail views pass `exists(request, *args, **kwargs)`: a matching ETag
+    (or `*`) is only answered with 304 when the object exists and belongs
+    to the user, otherwise the view runs and returns its 404.
+    """
+    if view is None:
+        return functools.partial(condition_on_collection_version, exists=exists)
+
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        etag = collection_etag(request)
+        if (request.method in ('GET', 'HEAD') and etag_matches(request, etag)
+                and (exists is None or exists(request, *args, **kwargs))):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            patch_vary_headers(response, ['Authorization'])
+        return response
+    return wrapped
@@ -0,0 +1,128 @@
+"""
+Connection pool monitoring.
+
+With the MongoDB (djongo) backend, `install()` registers a pymongo
+`ConnectionPoolListener` that tracks open and checked-out connections and
+checkout waits per server, so pool saturation shows up on `/metrics`. With
+PostgreSQL and `DB_POOL` on, the psycopg pool's own stats are reported.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+class PoolMetricsListener:
+    """
+    Handles pymongo's `ConnectionPoolListener` events. pymongo is only
+    imported by `install()`, which registers it as one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting = threading.local()
+        self.open = defaultdict(int)
+        self.checked_out = defaultdict(int)
+
+    @staticmethod
+    def _server(event):
+        host, port = event.address
+        return '%s:%s' % (host, port)
+
+    def _adjust(self, counts, event, delta):
+        with self._lock:
+            counts[self._server(event)] += delta
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.open.pop(self._server(event), None)
+            self.checked_out.pop(self._server(event), None)
+
+    def connection_created(self, event):
+        self._adjust(self.open, event, 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._adjust(self.open, event, -1)
+
+    def connection_check_out_started(self, event):
+        self._waiting.started = time.perf_counter()
+
+    def _waited(self, event):
+        started = getattr(self._waiting, 'started', None)
+        if started is not None:
+            self._waiting.started = None
+            checkout_wait_seconds.observe(time.perf_counter() - started, server=self._server(event))
+
+    def connection_check_out_failed(self, event):
+        self._waited(event)
+        checkout_failures_total.inc(server=self._server(event), reason=event.reason)
+
+    def connection_checked_out(self, event):
+        self._waited(event)
+        self._adjust(self.checked_out, event, 1)
+
+    def connection_checked_in(self, event):
+        self._adjust(self.checked_out, event, -1)
+
+    def samples(self):
+        maxsize = settings.DB_MAX_POOL_SIZE
+        with self._lock:
+            servers = sorted(self.open)
+            for server in servers:
+                yield {'server': server, 'state': 'open'}, self.open[server]
+                yield {'server': server, 'state': 'in_use'}, self.checked_out[server]
+                yield {'server': server, 'state': 'max'}, maxsize
+
+
+listener = PoolMetricsListener()
+
+
+def _postgres_samples():
+    for alias in connections:
+        connection = connections[alias]
+        if connection.vendor != 'postgresql' or not connection.settings_dict['OPTIONS'].get('pool'):
+            continue
+        stats = connection.pool.get_stats()
+        yield {'server': alias, 'state': 'open'}, stats.get('pool_size', 0)
+        yield {'server': alias, 'state': 'in_use'}, stats.get('pool_size', 0) - stats.get('pool_available', 0)
+        yield {'server': alias, 'state': 'max'}, stats.get('pool_max', 0)
+        yield {'server': alias, 'state': 'waiting'}, stats.get('requests_waiting', 0)
+
+
+def _samples():
+    yield from listener.samples()
+    yield from _postgres_samples()
+
+
+pool_connections = metrics.registry.register(metrics.CallbackGauge(
+    'notevault_db_pool_connections', 'DB pool connections by state.', ['server', 'state'], _samples))
+checkout_wait_seconds = metrics.registry.register(metrics.Histogram(
+    'notevault_db_pool_checkout_wait_seconds', 'Time waited for a pooled connection.', ['server'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)))
+checkout_failures_total = metrics.registry.register(metrics.Counter(
+    'notevault_db_pool_checkout_failures_total', 'Failed pool checkouts.', ['server', 'reason']))
+
+
+def install():
+    """Register the pymongo listener; must run before the first MongoClient is created."""
+    global listener
+    if any(connections[alias].settings_dict['ENGINE'] == 'djongo' for alias in connections):
+        from pymongo import monitoring  # only needed with the MongoDB backend
+
+        class MongoPoolListener(PoolMetricsListener, monitoring.ConnectionPoolListener):
+            pass
+
+        listener = MongoPoolListener()
+        monitoring.register(listener)
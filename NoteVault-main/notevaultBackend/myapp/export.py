@@ -0,0 +1,109 @@
+"""
+Streaming export of a user's vault.
+
+Rows are read with server-side iterators and written out one record at a
+time, so memory use does not grow with the size of the vault. Two formats:
+
+- NDJSON: one JSON object per line, categories first, then notes. Each
+  record has a `type` of "category" or "note"; notes carry both the
+  category id and its title so the file can be re-imported elsewhere.
+- Zip of Markdown files: one `<category>/<title>-<id>.md` file per note with
+  the note's metadata in a front-matter block.
+"""
+import io
+import json
+import re
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Category, Note
+
+CHUNK_SIZE = 500
+
+
+def _categories(user):
+    return Category.objects.filter(user=user).order_by('id').iterator(chunk_size=CHUNK_SIZE)
+
+
+def _notes(user):
+    return Note.objects.filter(user=user).order_by('id').iterator(chunk_size=CHUNK_SIZE)
+
+
+def vault_records(user):
+    titles = {}
+    for category in _categories(user):
+        titles[category.id] = category.title
+        yield {'type': 'category', 'id': category.id, 'title': category.title}
+    for note in _notes(user):
+        yield {
+            'type': 'note',
+            'id': note.id,
+            'title': note.title,
+            'content': note.content,
+            'category': note.category_id,
+            'category_title': titles.get(note.category_id),
+            'pinned': note.pinned,
+            'font_size': note.font_size,
+            'font_style': note.font_style,
+            'updated_at': note.updated_at,
+        }
+
+
+def stream_ndjson(user):
+    for record in vault_records(user):
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that hands back what was written since the last `take()`."""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _safe_name(name, fallback):
+    name = re.sub(r'[^\w\- ]+', '', name or '').strip()[:80]
+    return name or fallback
+
+
+def note_markdown(note, category_title):
+    front_matter = [
+        ('title', note.title),
+        ('category', category_title),
+        ('pinned', note.pinned),
+        ('font_size', note.font_size),
+        ('font_style', note.font_style),
+        ('updated_at', note.updated_at),
+    ]
+    lines = ['---']
+    lines += ['%s: %s' % (key, json.dumps(value, cls=DjangoJSONEncoder)) for key, value in front_matter]
+    lines += ['---', '', note.content]
+    return '\n'.join(lines)
+
+
+def stream_markdown_zip(user):
+    # zipfile writes local headers with data descriptors when the target is
+    # not seekable, so each file can be flushed to the client as soon as it
+    # has been compressed.
+    buffer = _ChunkBuffer()
+    titles = {category.id: category.title for category in _categories(user)}
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for note in _notes(user):
+            category_title = titles.get(note.category_id)
+            folder = _safe_name(category_title, 'Uncategorized')
+            filename = '%s/%s-%s.md' % (folder, _safe_name(note.title, 'note'), note.id)
+            archive.writestr(filename, note_markdown(note, category_title))
+            yield buffer.take()
+    yield buffer.take()
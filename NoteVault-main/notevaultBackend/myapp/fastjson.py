@@ -0,0 +1,113 @@
+"""
+Fast read path for the list endpoints.
+
+`ModelSerializer(many=True)` loads a model instance per row and calls
+every field's `to_representation` on it, which dominates the cost of long
+lists. The list views instead read exactly the needed columns with
+`.values()` and hand the rows to a `FieldPlan`, compiled once per field
+list, that only converts the few values JSON cannot hold as they are
+(datetimes).
+
+`FastJSONRenderer` then encodes the result, with orjson when it is
+installed. Its bytes are the same as DRF's `JSONRenderer`: compact
+separators, UTF-8 text rather than `\\u` escapes, U+2028/U+2029 escaped.
+"""
+import functools
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _datetime(value):
+    # Same format as DRF's DateTimeField and JSONEncoder.
+    if value is None:
+        return None
+    representation = value.isoformat()
+    if representation.endswith('+00:00'):
+        representation = representation[:-6] + 'Z'
+    return representation
+
+
+def _isoformat(value):
+    # DRF's default for DateField and TimeField.
+    return None if value is None else value.isoformat()
+
+
+class FieldPlan:
+    def __init__(self, model, fields):
+        self.fields = tuple(fields)
+        self.converters = []
+        for name in self.fields:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue  # annotations, e.g. a preview
+            if isinstance(field, models.DateTimeField):
+                self.converters.append((name, _datetime))
+            elif isinstance(field, (models.DateField, models.TimeField)):
+                self.converters.append((name, _isoformat))
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get(cls, model, fields):
+        return cls(model, fields)
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        meta = serializer_class.Meta
+        return cls.get(meta.model, tuple(meta.fields))
+
+    def represent(self, rows):
+        """Rows from `.values()` (which may hold extra columns) to plain data."""
+        fields = self.fields
+        data = [{name: row[name] for name in fields} for row in rows]
+        for name, convert in self.converters:
+            for item in data:
+                item[name] = convert(item[name])
+        return data
+
+
+def dumps(data):
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+    # Like JSONRenderer: these are valid JSON but break JavaScript string literals.
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer for plain data (what `FieldPlan` produces). Falls back to
+    the stock renderer for indented output, non-default JSON settings or
+    values the fast encoder does not handle.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        plain = (
+            self.get_indent(accepted_media_type, renderer_context or {}) is None
+            and not self.ensure_ascii and self.compact and self.strict
+        )
+        if plain:
+            try:
+                with timed('serializer'):
+                    return dumps(data)
+            except (TypeError, ValueError):
+                pass
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+LIST_RENDERERS = [FastJSONRenderer] + [
+    renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES if renderer is not JSONRenderer
+]
@@ -0,0 +1,178 @@
+"""
+Streaming import of notes from NDJSON (the `/export/` format) or a zip of
+Markdown files.
+
+The upload is parsed one record at a time. Categories are resolved by
+title through an in-memory map, created on first use, and notes are
+written in fixed-size `bulk_create` batches, each in its own transaction.
+Only one batch is held in memory at a time, so peak memory does not depend
+on the size of the upload; zip members larger than IMPORT_MAX_NOTE_BYTES
+are skipped without being decompressed in full. `VaultImporter.run_*`
+yield a progress dict after every batch.
+"""
+import json
+import posixpath
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import revisions, search
+from .models import Category, ChangeCounter, Note
+
+DEFAULT_CATEGORY = 'Imported'
+MAX_REPORTED_ERRORS = 20
+
+
+class VaultImporter:
+    def __init__(self, user, batch_size=None):
+        self.user = user
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.categories = dict(Category.objects.filter(user=user).values_list('title', 'id'))
+        self.source_categories = {}
+        self.batch = []
+        self.imported = 0
+        self.categories_created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def progress(self, done=False):
+        progress = {
+            'imported': self.imported,
+            'categories_created': self.categories_created,
+            'skipped': self.skipped,
+        }
+        if done:
+            progress['done'] = True
+            progress['errors'] = self.errors
+        return progress
+
+    def skip(self, where, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'record': where, 'error': message})
+
+    def category_id(self, title):
+        title = (title or '').strip()[:255] or DEFAULT_CATEGORY
+        if title not in self.categories:
+            self.categories[title] = Category.objects.create(title=title, user=self.user).id
+            self.categories_created += 1
+        return self.categories[title]
+
+    def add_note(self, where, title, content, category_title, pinned=False, font_size=None, font_style=None):
+        """Queue a note; returns True when the batch is full and was written."""
+        if not isinstance(title, str) or not title.strip():
+            self.skip(where, 'Missing title')
+            return False
+        if not isinstance(content, str):
+            self.skip(where, 'Missing content')
+            return False
+        note = Note(
+            user=self.user,
+            title=title.strip()[:255],
+            content=content,
+            category_id=self.category_id(category_title),
+            pinned=pinned is True,
+        )
+        if isinstance(font_size, int) and not isinstance(font_size, bool) and font_size > 0:
+            note.font_size = font_size
+        if isinstance(font_style, str) and font_style:
+            note.font_style = font_style[:255]
+        self.batch.append(note)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if not self.batch:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            first = ChangeCounter.allocate(self.user.id, len(self.batch))
+            for offset, note in enumerate(self.batch):
+                note.seq = first + offset
+                note.updated_at = now
+            Note.objects.bulk_create(self.batch)
+            search.index_notes(self.batch)
+            revisions.record(self.batch)
+        self.imported += len(self.batch)
+        self.batch = []
+
+    def run_ndjson(self, lines):
+        for number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', errors='replace')
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.skip(number, 'Invalid JSON')
+                continue
+            if not isinstance(record, dict):
+                self.skip(number, 'Expected a JSON object')
+                continue
+            if record.get('type') == 'category':
+                # Remember the exporter's ids so notes that only carry a
+                # category id still land in the right category.
+                self.source_categories[record.get('id')] = record.get('title')
+                self.category_id(record.get('title'))
+                continue
+            category_title = record.get('category_title') or self.source_categories.get(record.get('category'))
+            if self.add_note(number, record.get('title'), record.get('content'), category_title,
+                             record.get('pinned', False), record.get('font_size'), record.get('font_style')):
+                yield self.progress()
+        self.flush()
+        yield self.progress(done=True)
+
+    def run_markdown_zip(self, fileobj):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(('.md', '.markdown', '.txt')):
+                    continue
+                # The declared size can lie, so the read is capped as well.
+                limit = settings.IMPORT_MAX_NOTE_BYTES
+                if info.file_size > limit:
+                    self.skip(info.filename, 'File is larger than %d bytes' % limit)
+                    continue
+                with archive.open(info) as member:
+                    data = member.read(limit + 1)
+                if len(data) > limit:
+                    self.skip(info.filename, 'File is larger than %d bytes' % limit)
+                    continue
+                text = data.decode('utf-8', errors='replace')
+                meta, content = parse_front_matter(text)
+                folder = posixpath.dirname(info.filename)
+                stem = posixpath.splitext(posixpath.basename(info.filename))[0]
+                if self.add_note(info.filename, meta.get('title') or stem, content,
+                                 meta.get('category') or posixpath.basename(folder),
+                                 meta.get('pinned', False), meta.get('font_size'), meta.get('font_style')):
+                    yield self.progress()
+        self.flush()
+        yield self.progress(done=True)
+
+
+def parse_front_matter(text):
+    """
+    Split a Markdown file into its `---` front-matter block and body.
+    Values are read as JSON when possible (as written by the exporter) and
+    as plain strings otherwise.
+    """
+    lines = text.split('\n')
+    if not lines or lines[0].strip() != '---':
+        return {}, text
+    meta = {}
+    for index, line in enumerate(lines[1:], start=1):
+        if line.strip() == '---':
+            body = '\n'.join(lines[index + 1:])
+            return meta, body[1:] if body.startswith('\n') else body
+        key, separator, value = line.partition(':')
+        if separator:
+            value = value.strip()
+            try:
+                meta[key.strip()] = json.loads(value)
+            except ValueError:
+                meta[key.strip()] = value
+    return {}, text
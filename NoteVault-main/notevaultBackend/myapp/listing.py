@@ -0,0 +1,91 @@
+"""
+Query parameters of the notes list:
+
+    ?category=<id>        only notes in this category
+    ?pinned=true|false    only pinned or only unpinned notes
+    ?sort=-updated,title  sort keys (updated, title, pinned, id); a leading
+                          `-` sorts descending. Default: -pinned
+    ?fields=id,title      return only these fields
+    ?preview=<n>          add a `preview` field holding the first n
+                          characters of the content
+
+Rows are read with `.values()` and turned into the same data as
+`NoteSerializer` would produce (see `myapp.fastjson`). The preview is cut
+by the database, so note bodies are only loaded when `content` is among
+the requested fields (it is by default).
+"""
+from django.conf import settings
+from django.db.models.functions import Left
+
+from .fastjson import FieldPlan
+from .models import Note
+from .serializers import NoteSerializer
+
+SORT_KEYS = {'updated': 'updated_at', 'title': 'title', 'pinned': 'pinned', 'id': 'id'}
+DEFAULT_SORT = ('-pinned',)
+FIELDS = tuple(NoteSerializer.Meta.fields) + ('updated_at', 'preview')
+BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+
+class NoteListQuery:
+    def __init__(self, params):
+        self.filters = {}
+        if params.get('category'):
+            try:
+                self.filters['category_id'] = int(params['category'])
+            except ValueError:
+                raise ValueError('`category` must be a category id')
+        if params.get('pinned'):
+            if params['pinned'].lower() not in BOOLEANS:
+                raise ValueError('`pinned` must be true or false')
+            self.filters['pinned'] = BOOLEANS[params['pinned'].lower()]
+
+        self.ordering = self.parse_sort(params.get('sort'))
+
+        self.preview_length = None
+        if params.get('preview'):
+            try:
+                self.preview_length = int(params['preview'])
+            except ValueError:
+                self.preview_length = 0
+            if not 0 < self.preview_length <= settings.NOTES_MAX_PREVIEW_LENGTH:
+                raise ValueError('`preview` must be between 1 and %d' % settings.NOTES_MAX_PREVIEW_LENGTH)
+
+        self.fields = list(NoteSerializer.Meta.fields)
+        if 'fields' in params:
+            self.fields = [name.strip() for name in params['fields'].split(',') if name.strip()]
+            unknown = [name for name in self.fields if name not in FIELDS]
+            if unknown or not self.fields:
+                raise ValueError('`fields` must be a comma-separated subset of: ' + ', '.join(FIELDS))
+        if self.preview_length and 'preview' not in self.fields:
+            self.fields.append('preview')
+        if 'preview' in self.fields and not self.preview_length:
+            self.preview_length = settings.NOTES_PREVIEW_LENGTH
+        self.plan = FieldPlan.get(Note, tuple(self.fields))
+
+    @staticmethod
+    def parse_sort(value):
+        keys = [key.strip() for key in (value or '').split(',') if key.strip()] or list(DEFAULT_SORT)
+        ordering = []
+        for key in keys:
+            descending = key.startswith('-')
+            name = SORT_KEYS.get(key.lstrip('-'))
+            if name is None:
+                raise ValueError('`sort` keys must be among: ' + ', '.join(SORT_KEYS))
+            ordering.append('-' + name if descending else name)
+        # Keyset pagination needs a unique last key.
+        if not any(order.lstrip('-') == 'id' for order in ordering):
+            ordering.append('id')
+        return tuple(ordering)
+
+    def apply(self, queryset):
+        queryset = queryset.filter(**self.filters).order_by(*self.ordering)
+        if self.preview_length:
+            queryset = queryset.annotate(preview=Left('content', self.preview_length))
+        # Sort columns are selected too, for the pagination cursor.
+        columns = list(self.fields)
+        columns += [order.lstrip('-') for order in self.ordering if order.lstrip('-') not in columns]
+        return queryset.values(*columns)
+
+    def represent(self, rows):
+        return self.plan.represent(rows)
@@ -0,0 +1,151 @@
+"""
+Login hardening and throughput.
+
+- `hashing`: password hashes are computed on a bounded thread pool
+  (LOGIN_HASH_WORKERS threads, LOGIN_HASH_QUEUE waiting jobs). PBKDF2 in
+  hashlib releases the GIL, so the pool uses the available cores while
+  bounding how many logins burn CPU at once; when it is full, logins fail
+  fast with `HashingBusy` (503) instead of piling up on every worker thread.
+- `PooledModelBackend`: Django's ModelBackend with its hashing moved to
+  that pool. Database access stays on the request thread.
+- `login_throttle`: counts failed logins per username and per client IP in
+  memory (or a shared Django cache) and rejects further attempts before
+  any hashing happens.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+
+from .cache import LRUCache
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, function, *args):
+        if not self.slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            self.slots.release()
+
+
+hashing = HashingPool(settings.LOGIN_HASH_WORKERS, settings.LOGIN_HASH_QUEUE)
+
+
+class PooledModelBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords.
+            hashing.run(make_password, password)
+            return None
+
+        outdated = []
+        valid = hashing.run(check_password, password, user.password, outdated.append)
+        if valid and outdated:
+            # The stored hash uses old parameters; upgrade it as ModelBackend does.
+            user.password = hashing.run(make_password, password)
+            user.save(update_fields=['password'])
+        if valid and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+class FailureThrottle:
+    """
+    Failed-attempt counters per key over a fixed window. With `shared_alias`
+    the counts live in that Django cache, so all workers see them.
+    """
+    def __init__(self, window, shared_alias=None, maxsize=100000):
+        self.window = window
+        self.shared_alias = shared_alias
+        self.local = LRUCache(maxsize=maxsize, ttl=window)
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return 'login-failures:%s' % key
+
+    def count(self, key):
+        if self.shared_alias:
+            return caches[self.shared_alias].get(self._key(key), 0)
+        entry = self.local.get(key)
+        return entry[0] if entry else 0
+
+    def retry_after(self, key):
+        if self.shared_alias:
+            return self.window
+        entry = self.local.get(key)
+        return max(1, int(entry[1] + self.window - time.monotonic())) if entry else 0
+
+    def failed(self, key):
+        if self.shared_alias:
+            cache = caches[self.shared_alias]
+            cache.add(self._key(key), 0, timeout=self.window)
+            try:
+                cache.incr(self._key(key))
+            except ValueError:  # expired in between
+                cache.set(self._key(key), 1, timeout=self.window)
+            return
+        with self._lock:
+            count, started = self.local.get(key) or (0, time.monotonic())
+            remaining = started + self.window - time.monotonic()
+            self.local.set(key, (count + 1, started), ttl=max(remaining, 1))
+
+    def reset(self, key):
+        if self.shared_alias:
+            caches[self.shared_alias].delete(self._key(key))
+        else:
+            self.local.delete(key)
+
+
+class LoginThrottle:
+    def __init__(self, username_limit, ip_limit, window, shared_alias=None):
+        self.limits = {'user': username_limit, 'ip': ip_limit}
+        self.failures = FailureThrottle(window, shared_alias)
+
+    @staticmethod
+    def keys(username, ip):
+        # Usernames are case-sensitive: `Alice` and `alice` are different accounts.
+        return {'user': 'user:%s' % username, 'ip': 'ip:%s' % ip}
+
+    def retry_after(self, username, ip):
+        """Seconds to wait before another attempt, or 0 when allowed."""
+        for scope, key in self.keys(username, ip).items():
+            if self.failures.count(key) >= self.limits[scope]:
+                return self.failures.retry_after(key)
+        return 0
+
+    def failed(self, username, ip):
+        for key in self.keys(username, ip).values():
+            self.failures.failed(key)
+
+    def succeeded(self, username, ip):
+        self.failures.reset(self.keys(username, ip)['user'])
+
+
+login_throttle = LoginThrottle(
+    settings.LOGIN_THROTTLE['USERNAME_LIMIT'],
+    settings.LOGIN_THROTTLE['IP_LIMIT'],
+    settings.LOGIN_THROTTLE['WINDOW'],
+    settings.LOGIN_THROTTLE.get('SHARED_ALIAS'),
+)
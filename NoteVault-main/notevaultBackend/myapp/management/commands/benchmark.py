@@ -0,0 +1,257 @@
+import json
+import math
+import platform
+import random
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from myapp import search
+from myapp.models import Category, ChangeCounter, Note
+
+SCENARIOS = ('get_notes', 'search_notes', 'create_note', 'update_note', 'delete_category', 'login')
+
+VOCABULARY = """
+    meeting project budget travel recipe garden invoice lecture workout family
+    deadline review draft client launch holiday reading grocery design
+    research summary agenda ticket release migration backlog weekend dinner
+""".split()
+
+PASSWORD = 'bench-password-123'
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+def database_host(settings_dict):
+    """The database server's host name; djongo keeps it in the CLIENT URL instead of HOST."""
+    host = settings_dict.get('HOST') or (settings_dict.get('CLIENT') or {}).get('host') or ''
+    if '://' in host:
+        host = urlparse(host).hostname or ''
+    return host
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    # Nearest-rank percentile.
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic users, categories and notes and measure latency, throughput and '
+        'query counts of the REST API hot paths. Prints JSON results for comparing runs. '
+        'Run it against a local database, never production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=1000, help='Notes per user (default 1000).')
+        parser.add_argument('--users', type=int, default=1, help='Number of benchmark users (default 1).')
+        parser.add_argument('--categories', type=int, default=10, help='Categories per user (default 10).')
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Requests in flight at once (default 1). Above 1, query counts are not recorded.')
+        parser.add_argument('--category-notes', type=int, default=100,
+                            help='Notes in each category removed by the delete_category scenario.')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help='Comma-separated subset of: ' + ', '.join(SCENARIOS))
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for reproducible data.')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data afterwards.')
+        parser.add_argument('--allow-remote', action='store_true',
+                            help='Run against a database that is not SQLite or on a loopback host.')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError('Unknown scenarios: ' + ', '.join(sorted(unknown)))
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        # Only SQLite and explicit loopback hosts are known to be local.
+        host = database_host(connection.settings_dict)
+        if connection.vendor != 'sqlite' and host not in LOCAL_HOSTS and not options['allow_remote']:
+            raise CommandError('Refusing to seed and write to the %s database on %s; '
+                               'pass --allow-remote to run against it anyway.'
+                               % (connection.vendor, host or 'an unknown host'))
+        self.options = options
+        self.random = random.Random(options['seed'])
+
+        started = time.perf_counter()
+        users = self.seed()
+        seed_seconds = time.perf_counter() - started
+        # The hot paths are measured, not the rate limiter's refusals.
+        unthrottled = override_settings(RATE_LIMITS={**settings.RATE_LIMITS, 'ENABLED': False})
+        try:
+            with unthrottled:
+                results = {name: self.measure(name, users) for name in scenarios}
+        finally:
+            if not options['keep']:
+                User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'scale': {
+                'users': options['users'],
+                'categories_per_user': options['categories'],
+                'notes_per_user': options['notes'],
+                'seed_seconds': round(seed_seconds, 3),
+            },
+            'scenarios': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    # ------------------------- Seeding -------------------------
+
+    def text(self, words):
+        return ' '.join(self.random.choice(VOCABULARY) for _ in range(words))
+
+    def seed_notes(self, user, category_ids, count, batch_size=1000):
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            first = ChangeCounter.allocate(user.id, size)
+            now = timezone.now()
+            batch = [
+                Note(
+                    user=user,
+                    title=self.text(3).title(),
+                    content=self.text(self.random.randint(20, 200)),
+                    category_id=self.random.choice(category_ids),
+                    pinned=self.random.random() < 0.05,
+                    seq=first + offset,
+                    updated_at=now,
+                )
+                for offset in range(size)
+            ]
+            Note.objects.bulk_create(batch)
+            search.index_notes(batch)
+            created += size
+
+    def seed(self):
+        prefix = 'bench-%s' % int(time.time())
+        users = []
+        for index in range(self.options['users']):
+            user = User.objects.create_user(username='%s-%s' % (prefix, index), password=PASSWORD)
+            categories = [Category.objects.create(title='Category %s' % i, user=user)
+                          for i in range(self.options['categories'])]
+            self.seed_notes(user, [category.id for category in categories], self.options['notes'])
+            user.client = Client()
+            user.client.defaults['HTTP_AUTHORIZATION'] = 'Bearer %s' % RefreshToken.for_user(user).access_token
+            user.category_ids = [category.id for category in categories]
+            user.note_ids = list(Note.objects.filter(user=user).values_list('id', flat=True))
+            users.append(user)
+        return users
+
+    # ------------------------- Scenarios -------------------------
+
+    def request_for(self, name, user):
+        """Prepare one request of the scenario and return a callable that sends it."""
+        client = user.client if self.options['concurrency'] <= 1 else Client(**user.client.defaults)
+        if name == 'get_notes':
+            return lambda: client.get('/notes/', {'page_size': 50})
+        if name == 'search_notes':
+            query = ' '.join(self.random.sample(VOCABULARY, 2))
+            return lambda: client.get('/notes/search/', {'q': query})
+        if name == 'create_note':
+            data = {'title': self.text(3), 'content': self.text(50),
+                    'category': self.random.choice(user.category_ids), 'font_size': 16, 'font_style': 'normal'}
+            return lambda: client.post('/notes/create/', data, content_type='application/json')
+        if name == 'update_note':
+            note_id = self.random.choice(user.note_ids)
+            data = {'content': self.text(60)}
+            return lambda: client.put(f'/notes/update/{note_id}/', data, content_type='application/json')
+        if name == 'delete_category':
+            # Setup is not measured: a fresh category with notes to delete.
+            category = Category.objects.create(title='Doomed', user=user)
+            self.seed_notes(user, [category.id], self.options['category_notes'])
+            return lambda: client.delete(f'/categories/delete/{category.id}/')
+        if name == 'login':
+            data = {'username': user.username, 'password': PASSWORD}
+            return lambda: Client().post('/login/', data, content_type='application/json')
+
+    def measure(self, name, users):
+        for _ in range(self.options['warmup']):
+            self.request_for(name, self.random.choice(users))()
+
+        if self.options['concurrency'] > 1:
+            return self.measure_concurrently(name, users)
+
+        latencies, queries, statuses = [], [], Counter()
+        busy = 0.0
+        for _ in range(self.options['requests']):
+            send = self.request_for(name, self.random.choice(users))
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = send()
+                elapsed = time.perf_counter() - started
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            busy += elapsed
+            latencies.append(elapsed * 1000)
+            queries.append(len(captured))
+            statuses[response.status_code] += 1
+
+        return self.summary(name, latencies, busy, statuses, {
+            'mean': round(statistics.fmean(queries), 2),
+            'max': max(queries),
+        })
+
+    def measure_concurrently(self, name, users):
+        # Requests are prepared up front; only sending them is timed.
+        sends = [self.request_for(name, self.random.choice(users)) for _ in range(self.options['requests'])]
+
+        def timed_send(send):
+            started = time.perf_counter()
+            response = send()
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            return (time.perf_counter() - started) * 1000, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options['concurrency']) as executor:
+            results = list(executor.map(timed_send, sends))
+        wall = time.perf_counter() - started
+        return self.summary(name, [latency for latency, _ in results], wall,
+                            Counter(code for _, code in results), None)
+
+    def summary(self, name, latencies, seconds, statuses, queries):
+        self.stderr.write('%-16s p50 %8.2f ms  p99 %8.2f ms' % (name, percentile(latencies, 0.5),
+                                                              percentile(latencies, 0.99)))
+        return {
+            'requests': len(latencies),
+            'concurrency': self.options['concurrency'],
+            'latency_ms': {
+                'min': round(min(latencies), 3),
+                'mean': round(statistics.fmean(latencies), 3),
+                'p50': round(percentile(latencies, 0.50), 3),
+                'p95': round(percentile(latencies, 0.95), 3),
+                'p99': round(percentile(latencies, 0.99), 3),
+                'max': round(max(latencies), 3),
+            },
+            'throughput_rps': round(len(latencies) / seconds, 2) if seconds else None,
+            'queries': queries,
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        }
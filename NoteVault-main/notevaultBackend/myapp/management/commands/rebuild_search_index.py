@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from myapp import search
+from myapp.models import Note, SearchPosting, SearchStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from scratch for all notes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        SearchPosting.objects.all().delete()
+        SearchStats.objects.all().delete()
+
+        indexed = 0
+        batch = []
+        for note in Note.objects.order_by('id').iterator(chunk_size=batch_size):
+            batch.append(note)
+            if len(batch) == batch_size:
+                search.index_notes(batch)
+                indexed += len(batch)
+                batch = []
+                self.stdout.write(f'Indexed {indexed} notes...')
+        search.index_notes(batch)
+        indexed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} notes.'))
@@ -0,0 +1,315 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+`MetricsMiddleware` counts requests and records latency, DB time and
+external (AI model) time per URL name from `notevaultBackend/urls.py`.
+Cache hit/miss counters are read from every `TieredCache` at scrape time.
+`/metrics` renders everything, for scrapers from METRICS_ALLOWED_NETWORKS
+or with the METRICS_TOKEN bearer token.
+
+With several worker processes, set settings.METRICS_MULTIPROC_DIR to a
+directory shared by the workers (and emptied on deploy). Each process then
+periodically writes a snapshot of its own metrics there, and `/metrics`
+sums the snapshots of all processes, so any worker can answer a scrape.
+"""
+import glob
+import hmac
+import ipaddress
+import json
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import cache
+from .instrumentation import collect, current_timings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                json.dumps(key): {'buckets': list(state['buckets']), 'sum': state['sum'], 'count': state['count']}
+                for key, state in self._values.items()
+            }
+
+
+class CallbackCounter(Metric):
+    """Counter whose values are read from `callback()` at collection time."""
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames, callback):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def snapshot(self):
+        return {json.dumps(self._key(labels)): value for labels, value in self.callback()}
+
+
+class CallbackGauge(CallbackCounter):
+    """Gauge read at collection time; summed across processes."""
+    type = 'gauge'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {
+            metric.name: {
+                'type': metric.type,
+                'help': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'samples': metric.snapshot(),
+            }
+            for metric in self.metrics
+        }
+
+    # ------------------------- Multiprocess support -------------------------
+
+    def _snapshot_path(self, directory):
+        return os.path.join(directory, 'metrics-%d.json' % os.getpid())
+
+    def flush(self, force=False):
+        """Write this process's snapshot to the shared directory, at most every METRICS_FLUSH_INTERVAL."""
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(descriptor, 'w') as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary, self._snapshot_path(directory))
+
+    def collect(self):
+        """Snapshot of every process (merged) or just this one."""
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+        if not directory:
+            return self.snapshot()
+        self.flush(force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            try:
+                with open(path) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, dict(metric, samples={}))
+                for key, value in metric['samples'].items():
+                    target['samples'][key] = _add(target['samples'].get(key), value)
+        return merged
+
+    def render(self):
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append('# HELP %s %s' % (name, metric['help']))
+            lines.append('# TYPE %s %s' % (name, metric['type']))
+            labelnames = metric['labelnames']
+            for key, value in sorted(metric['samples'].items()):
+                labels = list(zip(labelnames, json.loads(key)))
+                if metric['type'] != 'histogram':
+                    lines.append('%s%s %s' % (name, _labels(labels), _number(value)))
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric['buckets'], value['buckets']):
+                    cumulative += count
+                    lines.append('%s_bucket%s %d' % (name, _labels(labels + [('le', _number(bound))]), cumulative))
+                lines.append('%s_bucket%s %d' % (name, _labels(labels + [('le', '+Inf')]), value['count']))
+                lines.append('%s_sum%s %s' % (name, _labels(labels), _number(value['sum'])))
+                lines.append('%s_count%s %d' % (name, _labels(labels), value['count']))
+        return '\n'.join(lines) + '\n'
+
+
+def _add(current, value):
+    if current is None:
+        return value
+    if isinstance(value, dict):
+        return {
+            'buckets': [a + b for a, b in zip(current['buckets'], value['buckets'])],
+            'sum': current['sum'] + value['sum'],
+            'count': current['count'] + value['count'],
+        }
+    return current + value
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{%s}' % ','.join(escaped)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _cache_samples():
+    for tiered in cache.all_caches():
+        stats = tiered.stats()
+        yield {'cache': stats['name'], 'result': 'hit'}, stats['hits']
+        yield {'cache': stats['name'], 'result': 'shared_hit'}, stats['shared_hits']
+        yield {'cache': stats['name'], 'result': 'miss'}, stats['misses']
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    'notevault_http_requests_total', 'HTTP requests handled.', ['route', 'method', 'status']))
+request_seconds = registry.register(Histogram(
+    'notevault_http_request_duration_seconds', 'Time to produce a response.', ['route']))
+db_seconds = registry.register(Histogram(
+    'notevault_db_duration_seconds', 'Time spent in DB queries per request.', ['route']))
+db_queries_total = registry.register(Counter(
+    'notevault_db_queries_total', 'DB queries executed.', ['route']))
+external_seconds = registry.register(Histogram(
+    'notevault_external_call_duration_seconds', 'Time spent in AI model calls per request.', ['route']))
+cache_lookups_total = registry.register(CallbackCounter(
+    'notevault_cache_lookups_total', 'Cache lookups by result.', ['cache', 'result'], _cache_samples))
+
+
+class MetricsMiddleware:
+    # Dual-mode like RequestTimingMiddleware, so ASGI keeps async views async.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = current_timings()
+        if timings is None:
+            with collect() as timings:
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        self.record(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        timings = current_timings()
+        if timings is None:
+            with collect() as timings:
+                response = await self.get_response(request)
+        else:
+            response = await self.get_response(request)
+        self.record(request, response, timings)
+        return response
+
+    def record(self, request, response, timings):
+        elapsed = timings.elapsed()
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        requests_total.inc(route=route, method=request.method, status=response.status_code)
+        request_seconds.observe(elapsed, route=route)
+        db_seconds.observe(timings.durations.get('db', 0.0), route=route)
+        db_queries_total.inc(timings.counts.get('db', 0), route=route)
+        if 'external' in timings.durations:
+            external_seconds.observe(timings.durations['external'], route=route)
+        registry.flush()
+
+
+def scrape_allowed(request):
+    """
+    Requests carrying `Authorization: Bearer <METRICS_TOKEN>`, or from a client
+    in METRICS_ALLOWED_NETWORKS. Behind NUM_PROXIES proxies the client is the
+    forwarded address, so a same-host proxy's loopback address does not count.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+    networks = getattr(settings, 'METRICS_ALLOWED_NETWORKS', ())
+    if not networks:
+        return False
+    # Without NUM_PROXIES, X-Forwarded-For is client-supplied and ignored.
+    if api_settings.NUM_PROXIES is not None:
+        client = BaseThrottle().get_ident(request)
+    else:
+        client = request.META.get('REMOTE_ADDR', '')
+    try:
+        address = ipaddress.ip_address(client)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in networks)
+
+
+def metrics_view(request):
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
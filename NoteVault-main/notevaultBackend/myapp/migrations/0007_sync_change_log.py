@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_initial_seqs(apps, schema_editor):
+    """Number existing categories and notes so a first sync (since=0) sees them."""
+    ChangeCounter = apps.get_model('myapp', 'ChangeCounter')
+    counters = {}
+    for model_name in ('Category', 'Note'):
+        model = apps.get_model('myapp', model_name)
+        batch = []
+        for obj in model.objects.order_by('id').only('id', 'user_id').iterator(chunk_size=1000):
+            counters[obj.user_id] = obj.seq = counters.get(obj.user_id, 0) + 1
+            batch.append(obj)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['seq'])
+                batch = []
+        model.objects.bulk_update(batch, ['seq'])
+    ChangeCounter.objects.bulk_create(
+        [ChangeCounter(user_id=user_id, value=value) for user_id, value in counters.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0006_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('note', 'Note'), ('category', 'Category')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('seq', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['user', 'seq'], name='category_user_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['user', 'seq'], name='note_user_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='changecounter',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'seq'], name='tombstone_user_seq_idx'),
+        ),
+        migrations.RunPython(assign_initial_seqs, migrations.RunPython.noop),
+    ]
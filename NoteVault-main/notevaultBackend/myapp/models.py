@@ -1,15 +1,62 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
 
-class Category(models.Model):
+class ChangeCounter(models.Model):
+    # Per-user, monotonically increasing change sequence. Every write to a
+    # note or category (and every delete) takes the next value, so clients
+    # can ask for "everything after seq N".
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, user_id, count=1):
+        """
+        Reserve `count` consecutive sequence numbers and return the first.
+        Call inside the transaction that writes the changed rows: the
+        counter row stays locked until commit, so a user's changes commit
+        in sequence order.
+        """
+        cls.objects.get_or_create(user_id=user_id)
+        cls.objects.filter(user_id=user_id).update(value=F('value') + count)
+        return cls.current(user_id) - count + 1
+
+    @classmethod
+    def current(cls, user_id):
+        return cls.objects.filter(user_id=user_id).values_list('value', flat=True).first() or 0
+
+
+class VersionedModel(models.Model):
+    updated_at = models.DateTimeField(auto_now=True)
+    seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'seq', 'updated_at'}
+        with transaction.atomic():
+            self.seq = ChangeCounter.allocate(self.user_id)
+            super().save(*args, **kwargs)
+
+
+class Category(VersionedModel):
     title = models.CharField(max_length=255)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='category_user_seq_idx'),
+            models.Index(fields=['user', 'id'], name='category_user_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
-class Note(models.Model):
+class Note(VersionedModel):
     title = models.CharField(max_length=255)
     content = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
@@ -17,7 +64,75 @@ class Note(models.Model):
     pinned = models.BooleanField(default=False)
     font_size = models.IntegerField(default=16)
     font_style = models.CharField(max_length=255, default='normal')
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='note_user_seq_idx'),
+            # Note listings: filter by user, order by -pinned, id.
+            models.Index(fields=['user', '-pinned', 'id'], name='note_user_pinned_idx'),
+            models.Index(fields=['user', 'category'], name='note_user_category_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class NoteRevision(models.Model):
+    # One saved version of a note (see myapp.revisions). `data` holds the
+    # full content when `base == number` (a snapshot), otherwise a delta
+    # against revision `number - 1`; `base` is the snapshot the delta chain
+    # starts from.
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='revisions')
+    number = models.IntegerField()
+    base = models.IntegerField()
+    title = models.CharField(max_length=255)
+    length = models.IntegerField()
+    digest = models.BinaryField(max_length=8)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['note', 'number'], name='note_revision_number_uniq'),
+        ]
+
+
+class Tombstone(models.Model):
+    # Marks a deleted note or category so sync clients can drop it locally.
+    NOTE = 'note'
+    CATEGORY = 'category'
+    KIND_CHOICES = [(NOTE, 'Note'), (CATEGORY, 'Category')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    seq = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='tombstone_user_seq_idx'),
+        ]
+
+class SearchStats(models.Model):
+    # Per-user corpus statistics for BM25, kept up to date incrementally so
+    # a search never has to scan the whole corpus to compute them.
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    document_count = models.IntegerField(default=0)
+    total_length = models.BigIntegerField(default=0)
+
+
+class SearchPosting(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    note = models.ForeignKey(Note, on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+    frequency = models.IntegerField()
+    document_length = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'term'], name='posting_user_term_idx'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.term
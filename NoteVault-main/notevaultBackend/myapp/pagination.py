@@ -0,0 +1,116 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks past the last row of the previous page
+    instead of using an OFFSET, so every page costs the same no matter how
+    deep into the list the client is.
+
+    Pagination is opt-in by default: clients that send neither `cursor` nor
+    `page_size` get the unpaginated list, which keeps the existing frontend
+    working. Subclasses set `optional = False` to always paginate.
+    The `next` value in a paginated response is an opaque token to be sent
+    back as `?cursor=`.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    optional = True
+
+    def __init__(self, ordering):
+        # The last field must be unique (normally `id`) so that every row
+        # has a distinct position.
+        self.ordering = tuple(ordering)
+        self.next_cursor = None
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'NOTES_PAGE_SIZE', 50)
+        maximum = getattr(settings, 'NOTES_MAX_PAGE_SIZE', 200)
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            page_size = default
+        return max(1, min(page_size, maximum))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (self.optional and self.cursor_query_param not in params
+                and self.page_size_query_param not in params):
+            return None
+
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(queryset.model, self.decode_cursor(cursor)))
+
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if len(rows) > page_size else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_cursor, 'results': data})
+
+    def seek_filter(self, model, values):
+        """
+        Build the lexicographic "comes after" condition for the ordering,
+        e.g. for ('-pinned', 'id'):
+            (pinned < p) OR (pinned = p AND id > i)
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for order, raw_value in zip(self.ordering, values):
+            name = order.lstrip('-')
+            try:
+                value = model._meta.get_field(name).to_python(raw_value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = '%s__lt' % name if order.startswith('-') else '%s__gt' % name
+            condition |= equal_so_far & Q(**{lookup: value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, row):
+        values = []
+        for order in self.ordering:
+            name = order.lstrip('-')
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            # Full precision: DjangoJSONEncoder drops microseconds.
+            values.append(value.isoformat() if isinstance(value, datetime.datetime) else value)
+        payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except (UnicodeError, binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+
+class NotePagination(KeysetPagination):
+    def __init__(self, ordering=('-pinned', 'id')):
+        super().__init__(ordering)
+
+
+class RevisionPagination(KeysetPagination):
+    # Revision numbers are unique per note, so they alone order the page.
+    optional = False
+
+    def __init__(self, ordering=('-number',)):
+        super().__init__(ordering)
@@ -0,0 +1,246 @@
+"""
+Text-intelligence providers for the summarize and grammar-check endpoints.
+
+The provider is built on the first AI request, from settings.AI_PROVIDER
+(and optionally settings.AI_FALLBACK_PROVIDER), and reused by every request
+after it; management commands never load the remote client:
+
+- `GeminiProvider` runs the prompt pipelines in `myapp.ai` against Google's
+  generative model, configuring the client a single time.
+- `LocalProvider` needs no network: an extractive summarizer and a
+  rule-based spell/grammar fixer. Use it for offline load tests or as the
+  fallback when the remote provider is slow or failing.
+- `FailoverProvider` wraps a primary and a fallback provider and switches
+  to the fallback when the primary errors, exceeds
+  settings.AI_FAILOVER_TIMEOUT, or already has AI_MAX_CONCURRENCY calls
+  running.
+
+Every provider answers `run(operation, text)` (and `arun` for the async
+views) with a `(payload, status_code)` pair, where operation is
+"summarize" or "check". Results are cached by content hash per provider.
+"""
+import abc
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework import status
+
+from . import ai
+from .cache import ai_response_cache, content_key
+
+logger = logging.getLogger(__name__)
+
+
+class Provider(abc.ABC):
+    name = None
+
+    def run(self, operation, original_text):
+        key = content_key(operation, self.name, original_text)
+        result = ai_response_cache.get(key)
+        if result is None:
+            result = getattr(self, operation)(original_text)
+            ai_response_cache.set(key, result)
+        return result
+
+    async def arun(self, operation, original_text):
+        key = content_key(operation, self.name, original_text)
+        result = await ai_response_cache.aget(key)
+        if result is None:
+            result = await getattr(self, 'a' + operation)(original_text)
+            await ai_response_cache.aset(key, result)
+        return result
+
+    @abc.abstractmethod
+    def summarize(self, original_text):
+        """Return `(payload, status_code)` for a summary of the text."""
+
+    @abc.abstractmethod
+    def check(self, original_text):
+        """Return `(payload, status_code)` for the grammar-corrected text."""
+
+    async def asummarize(self, original_text):
+        return self.summarize(original_text)
+
+    async def acheck(self, original_text):
+        return self.check(original_text)
+
+
+class GeminiProvider(Provider):
+    def __init__(self, model=None, model_name=None, api_key=None):
+        model_name = model_name or settings.AI_MODEL
+        self.name = 'gemini:%s' % model_name
+        if model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key or settings.KEY)
+            model = genai.GenerativeModel(model_name)
+        self.model = model
+
+    def summarize(self, original_text):
+        return ai.run(ai.summarize, self.model, original_text)
+
+    def check(self, original_text):
+        return ai.run(ai.check, self.model, original_text)
+
+    async def asummarize(self, original_text):
+        return await ai.arun(ai.summarize, self.model, original_text)
+
+    async def acheck(self, original_text):
+        return await ai.arun(ai.check, self.model, original_text)
+
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+WORD_RE = re.compile(r"[A-Za-z']+")
+
+COMMON_MISSPELLINGS = {
+    'acheive': 'achieve', 'accomodate': 'accommodate', 'adress': 'address',
+    'alot': 'a lot', 'arguement': 'argument', 'becuase': 'because',
+    'beleive': 'believe', 'calender': 'calendar', 'definately': 'definitely',
+    'dissapoint': 'disappoint', 'enviroment': 'environment', 'existance': 'existence',
+    'goverment': 'government', 'grammer': 'grammar', 'happend': 'happened',
+    'im': "I'm", 'independant': 'independent', 'occured': 'occurred',
+    'occurence': 'occurrence', 'posible': 'possible', 'recieve': 'receive',
+    'recieved': 'received', 'seperate': 'separate', 'sucess': 'success',
+    'teh': 'the', 'thier': 'their', 'tommorow': 'tomorrow', 'tomorow': 'tomorrow',
+    'truely': 'truly', 'untill': 'until', 'wich': 'which', 'wierd': 'weird',
+    'dont': "don't", 'doesnt': "doesn't", 'cant': "can't", 'wont': "won't",
+    'didnt': "didn't", 'isnt': "isn't", 'thats': "that's",
+}
+
+SUMMARY_STOP_WORDS = frozenset("""
+    a an and are as at be but by for from had has have he her his i in is it
+    its me my not of on or our she so that the their them they this to was we
+    were what when which who will with you your
+""".split())
+
+
+class LocalProvider(Provider):
+    """
+    Offline provider: extractive summaries and rule-based corrections. The
+    results are cruder than a language model's but cost microseconds.
+    """
+    name = 'local'
+
+    def __init__(self, max_summary_sentences=5):
+        self.max_summary_sentences = max_summary_sentences
+
+    def summarize(self, original_text):
+        if not WORD_RE.search(original_text):
+            return (
+                {'message': 'The provided text cannot be summarized meaningfully. Please provide coherent text.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+        sentences = [sentence.strip() for sentence in SENTENCE_RE.split(original_text.strip()) if sentence.strip()]
+        words = [word.lower() for word in WORD_RE.findall(original_text)]
+        frequencies = Counter(word for word in words if word not in SUMMARY_STOP_WORDS)
+
+        def score(sentence):
+            tokens = [word.lower() for word in WORD_RE.findall(sentence)]
+            return sum(frequencies[token] for token in tokens) / (len(tokens) or 1)
+
+        keep = min(self.max_summary_sentences, max(1, math.ceil(len(sentences) / 3)))
+        chosen = sorted(sorted(range(len(sentences)), key=lambda i: -score(sentences[i]))[:keep])
+        summary = self.fix(' '.join(sentences[i] for i in chosen))
+        if not summary or summary.lower() == original_text.lower() or len(summary) < 3:
+            return (
+                {'message': 'The summarization failed to produce meaningful output. Please provide valid and coherent text.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+        return {'summary': summary}, status.HTTP_200_OK
+
+    def check(self, original_text):
+        if not WORD_RE.search(original_text):
+            return (
+                {'message': 'The provided text is nonsensical or invalid. Please provide meaningful input.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+        corrected_text = self.fix(original_text)
+        if not corrected_text.endswith((".", "!", "?")):
+            corrected_text += "."
+        if corrected_text == original_text.strip():
+            return {'message': 'No fix required!'}, status.HTTP_200_OK
+        return {'correctedText': corrected_text}, status.HTTP_200_OK
+
+    def fix(self, text):
+        def correct_word(match):
+            word = match.group()
+            replacement = COMMON_MISSPELLINGS.get(word.lower())
+            if replacement is None:
+                return word
+            return replacement[0].upper() + replacement[1:] if word[0].isupper() else replacement
+
+        text = ' '.join(text.split())
+        text = WORD_RE.sub(correct_word, text)
+        # Repeated words ("the the") and a lowercase standalone "i".
+        text = re.sub(r'\b(\w+) \1\b', r'\1', text, flags=re.IGNORECASE)
+        text = re.sub(r"\bi\b(?!\.\w)", 'I', text)
+        # No space before punctuation, one space after it.
+        text = re.sub(r'\s+([,.!?;:])', r'\1', text)
+        text = re.sub(r'([,!?;:])(?=[A-Za-z])', r'\1 ', text)
+        # Capitalize the start of every sentence.
+        return re.sub(r'(^|[.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), text)
+
+
+class FailoverProvider(Provider):
+    def __init__(self, primary, fallback, timeout=None):
+        self.primary = primary
+        self.fallback = fallback
+        self.timeout = settings.AI_FAILOVER_TIMEOUT if timeout is None else timeout
+        self.name = '%s|%s' % (primary.name, fallback.name)
+        self._executor = ThreadPoolExecutor(max_workers=settings.AI_MAX_CONCURRENCY,
+                                            thread_name_prefix='ai-failover')
+        # Primary calls that timed out keep running on the executor; count
+        # them, so a saturated pool fails over at once instead of queueing.
+        self._slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENCY)
+
+    def summarize(self, original_text):
+        return self.run('summarize', original_text)
+
+    def check(self, original_text):
+        return self.run('check', original_text)
+
+    def run(self, operation, original_text):
+        # Each side caches under its own name, so a degraded fallback answer
+        # is never served later in place of the primary's.
+        if not self._slots.acquire(blocking=False):
+            logger.warning('%s provider is saturated for %s, using %s', self.primary.name, operation,
+                           self.fallback.name)
+            return self.fallback.run(operation, original_text)
+        try:
+            # In the request's context, so its timings include the call.
+            future = self._executor.submit(contextvars.copy_context().run, self.primary.run, operation,
+                                           original_text)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except Exception:
+            logger.warning('%s provider failed for %s, using %s', self.primary.name, operation,
+                           self.fallback.name, exc_info=True)
+            return self.fallback.run(operation, original_text)
+
+    async def arun(self, operation, original_text):
+        try:
+            return await asyncio.wait_for(self.primary.arun(operation, original_text), self.timeout)
+        except Exception:
+            logger.warning('%s provider failed for %s, using %s', self.primary.name, operation,
+                           self.fallback.name, exc_info=True)
+            return await self.fallback.arun(operation, original_text)
+
+
+@functools.lru_cache(maxsize=None)
+def get_provider():
+    provider = import_string(settings.AI_PROVIDER)()
+    if getattr(settings, 'AI_FALLBACK_PROVIDER', None):
+        provider = FailoverProvider(provider, import_string(settings.AI_FALLBACK_PROVIDER)())
+    return provider
@@ -0,0 +1,195 @@
+"""
+Token-bucket rate limiting for the AI and write endpoints.
+
+Every client has one bucket per scope (`ai`, `write`, see
+settings.RATE_LIMITS). A bucket holds up to BURST tokens and refills at
+PER_MINUTE tokens a minute; each request takes a token, and when none is
+left the request is refused with 429 and a Retry-After of the seconds until
+the next one. Clients are authenticated users, otherwise the client IP.
+
+Buckets live in this process by default. With STORE set to a file path
+they are kept in a SQLite table in that file instead, so every worker on
+the host draws from the same buckets; each take is one short
+`BEGIN IMMEDIATE` transaction. If the shared store fails, requests are let
+through rather than refused.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+from .authentication import CachedJWTAuthentication
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Every this many takes the shared store drops buckets that have refilled.
+PRUNE_EVERY = 1000
+
+rate_limited_total = metrics.registry.register(metrics.Counter(
+    'notevault_rate_limited_total', 'Requests refused by the rate limiter.', ['scope']))
+
+
+@checks.register()
+def check_rate_limits(app_configs=None, **kwargs):
+    """System check: every scope needs BURST >= 1 and PER_MINUTE > 0 (the refill divides by it)."""
+    errors = []
+    for scope, limits in settings.RATE_LIMITS['SCOPES'].items():
+        if not limits.get('BURST', 0) >= 1 or not limits.get('PER_MINUTE', 0) > 0:
+            errors.append(checks.Error(
+                "RATE_LIMITS scope '%s' needs BURST >= 1 and PER_MINUTE > 0." % scope,
+                hint='Remove the scope to leave its endpoints unlimited.',
+                id='myapp.E001',
+            ))
+    return errors
+
+
+def _take(tokens, updated, now, burst, rate):
+    """Refill a bucket up to `now` and take a token: (tokens left, seconds to wait)."""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class LocalBuckets:
+    def __init__(self, maxsize=100000):
+        self.buckets = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def take(self, key, burst, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self.buckets.get(key) or (burst, now)
+            tokens, wait = _take(tokens, updated, now, burst, rate)
+            # Once it has refilled, a bucket is the same as no bucket.
+            self.buckets.set(key, (tokens, now), ttl=(burst - tokens) / rate or None)
+        return wait
+
+
+class SQLiteBuckets:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, burst, rate):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = connection.execute(
+                'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, wait = _take(*(row or (burst, now)), now, burst, rate)
+            connection.execute(
+                'INSERT INTO rate_limit_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'tokens = excluded.tokens, updated = excluded.updated, full_at = excluded.full_at',
+                (key, tokens, now, now + (burst - tokens) / rate),
+            )
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                connection.execute('DELETE FROM rate_limit_buckets WHERE full_at < ?', (now,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RateLimiter:
+    def __init__(self):
+        self.local = LocalBuckets()
+        self._shared = {}
+        self._lock = threading.Lock()
+
+    def buckets(self, store):
+        if not store:
+            return self.local
+        with self._lock:
+            if store not in self._shared:
+                self._shared[store] = SQLiteBuckets(store)
+            return self._shared[store]
+
+    def take(self, scope, ident):
+        """Take a token from the client's bucket; returns 0 or the seconds to wait."""
+        config = settings.RATE_LIMITS
+        limits = config['SCOPES'].get(scope)
+        if not config['ENABLED'] or not limits:
+            return 0
+        try:
+            wait = self.buckets(config['STORE']).take(
+                '%s:%s' % (scope, ident), limits['BURST'], limits['PER_MINUTE'] / 60)
+        except sqlite3.Error:
+            logger.warning('Rate limit store %s failed; allowing the request', config['STORE'], exc_info=True)
+            return 0
+        if wait:
+            rate_limited_total.inc(scope=scope)
+        return wait
+
+
+rate_limiter = RateLimiter()
+
+
+def client_ident(request):
+    """The authenticated user's id, otherwise the client IP (honouring NUM_PROXIES)."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return 'user:%s' % user.pk
+    return 'ip:%s' % BaseThrottle().get_ident(request)
+
+
+def jwt_client_ident(request):
+    """
+    `client_ident` for plain Django views: resolves the JWT user the way DRF
+    views do, so both kinds of view share a client's buckets. Blocks on the
+    database for uncached users; async views call it through sync_to_async.
+    """
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except APIException:  # invalid or expired token: count against the IP
+        authenticated = None
+    if authenticated is not None:
+        return 'user:%s' % authenticated[0].pk
+    return 'ip:%s' % BaseThrottle().get_ident(request)
+
+
+def take_for_request(scope, request):
+    return rate_limiter.take(scope, jwt_client_ident(request))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def allow_request(self, request, view):
+        self.wait_seconds = rate_limiter.take(self.scope, client_ident(request))
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AIRateThrottle(TokenBucketThrottle):
+    scope = 'ai'
+
+
+class WriteRateThrottle(TokenBucketThrottle):
+    scope = 'write'
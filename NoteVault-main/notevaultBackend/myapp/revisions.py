@@ -0,0 +1,145 @@
+"""
+Note revision history.
+
+Every change to a note's title or content is kept as a `NoteRevision`.
+Autosaving clients save often, so a full copy per revision would grow
+storage with every keystroke pause. Most revisions therefore store a
+delta against the revision before them: the new content as runs of lines
+copied from the previous version (`[start, end]`) and the text inserted
+between them, JSON-encoded and zlib-compressed. Every
+NOTE_REVISION_SNAPSHOT_INTERVAL revisions, and whenever a delta would not
+be smaller, the compressed full content is stored instead, so rebuilding
+any version reads one snapshot and fewer than that many deltas.
+
+Writers call `record(notes, previous)` after saving, like
+`search.index_notes`; `previous` maps note ids to their content before the
+save. When it does not match the latest revision (the note was changed
+without recording one), the new revision is a snapshot.
+"""
+import difflib
+import hashlib
+import json
+import logging
+import zlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import NoteRevision
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+
+def diff(old, new):
+    """Line-level delta turning `old` into `new`."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    ops = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def patch(old, ops):
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(op if isinstance(op, str) else ''.join(old_lines[op[0]:op[1]]) for op in ops)
+
+
+def _encode_delta(ops):
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _latest(note_ids):
+    newest = NoteRevision.objects.filter(note=OuterRef('note')).order_by('-number').values('number')[:1]
+    rows = (
+        NoteRevision.objects.filter(note_id__in=note_ids, number=Subquery(newest))
+        .values('note_id', 'number', 'base', 'title', 'digest')
+    )
+    return {row['note_id']: row for row in rows}
+
+
+def record(notes, previous=None):
+    """
+    Add a revision for each note whose title or content differs from its
+    latest revision. `previous` maps note ids to the content the save
+    replaced; notes missing from it get a snapshot.
+    """
+    previous = previous or {}
+    notes = [note for note in notes if note.pk is not None]
+    if not notes:
+        return
+    interval = settings.NOTE_REVISION_SNAPSHOT_INTERVAL
+    latest = _latest([note.pk for note in notes])
+    revisions = []
+    for note in notes:
+        last = latest.get(note.pk)
+        digest = _digest(note.content)
+        if last and bytes(last['digest']) == digest and last['title'] == note.title:
+            continue
+        revision = NoteRevision(
+            note_id=note.pk, number=last['number'] + 1 if last else 1,
+            title=note.title, length=len(note.content), digest=digest,
+        )
+        snapshot = zlib.compress(note.content.encode('utf-8'))
+        base_content = previous.get(note.pk)
+        chained = (
+            last is not None and base_content is not None
+            and bytes(last['digest']) == _digest(base_content)
+            and revision.number - last['base'] < interval
+        )
+        delta = _encode_delta(diff(base_content, note.content)) if chained else None
+        if delta is not None and len(delta) < len(snapshot):
+            revision.base, revision.data = last['base'], delta
+        else:
+            revision.base, revision.data = revision.number, snapshot
+        revisions.append(revision)
+    if not revisions:
+        return
+    try:
+        with transaction.atomic():
+            NoteRevision.objects.bulk_create(revisions, batch_size=500)
+    except IntegrityError:
+        # A concurrent save took the same revision number and its revision
+        # is kept. The next save chains from it, or snapshots if the saved
+        # content no longer matches it.
+        logger.warning('Skipped revisions of notes %s after a concurrent save', [r.note_id for r in revisions])
+
+
+def list_revisions(note_id):
+    """The note's revisions without their content, newest first, as a queryset to page."""
+    return (
+        NoteRevision.objects.filter(note_id=note_id).order_by('-number')
+        .values('number', 'title', 'length', 'created_at')
+    )
+
+
+def get_revision(note_id, number):
+    """Revision `number` of the note with its full content, or None."""
+    target = (
+        NoteRevision.objects.filter(note_id=note_id, number=number)
+        .values('number', 'base', 'title', 'created_at').first()
+    )
+    if target is None:
+        return None
+    chain = (
+        NoteRevision.objects.filter(note_id=note_id, number__gte=target['base'], number__lte=number)
+        .order_by('number').values_list('number', 'base', 'data')
+    )
+    content = None
+    for revision_number, base, data in chain:
+        data = zlib.decompress(bytes(data))
+        if base == revision_number:
+            content = data.decode('utf-8')
+        else:
+            content = patch(content, json.loads(data))
+    target.pop('base')
+    target['content'] = content
+    return target
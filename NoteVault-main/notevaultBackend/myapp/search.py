@@ -0,0 +1,195 @@
+"""
+Full-text search over a user's notes.
+
+Notes are tokenized into an inverted index (`SearchPosting`, one row per
+term per note) when they are created, updated or deleted. A query only
+reads the postings of its own terms, so its cost grows with the number of
+matching notes rather than with the size of the vault. Results are ranked
+with Okapi BM25 using per-user corpus statistics kept in `SearchStats`.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db.models import F, Q
+from django.utils.html import escape
+
+from .models import Category, Note, SearchPosting, SearchStats
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MIN_PREFIX_LENGTH = 2
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or
+    that the this to was were will with
+""".split())
+
+# Standard BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS and len(token) <= MAX_TERM_LENGTH
+    ]
+
+
+def index_notes(notes):
+    """
+    (Re)index the given notes, replacing any postings they already have.
+    Works in a constant number of queries regardless of how many notes are
+    passed in.
+    """
+    notes = [note for note in notes if note.pk]
+    if not notes:
+        return
+    note_ids = [note.pk for note in notes]
+    category_ids = {note.category_id for note in notes if note.category_id}
+    category_titles = dict(Category.objects.filter(id__in=category_ids).values_list('id', 'title'))
+
+    deltas = _remove_postings(note_ids)
+    postings = []
+    for note in notes:
+        tokens = tokenize(note.title) + tokenize(note.content) + tokenize(category_titles.get(note.category_id))
+        if not tokens:
+            continue
+        length = len(tokens)
+        for term, frequency in Counter(tokens).items():
+            postings.append(SearchPosting(
+                user_id=note.user_id,
+                note_id=note.pk,
+                term=term,
+                frequency=frequency,
+                document_length=length,
+            ))
+        deltas[note.user_id][0] += 1
+        deltas[note.user_id][1] += length
+    SearchPosting.objects.bulk_create(postings, batch_size=1000)
+    _apply_stats(deltas)
+
+
+def remove_notes(note_ids):
+    """Drop the given notes from the index. Call before deleting the notes."""
+    note_ids = list(note_ids)
+    if note_ids:
+        _apply_stats(_remove_postings(note_ids))
+
+
+def reindex_category(category):
+    """Reindex every note in a category, e.g. after its title changed."""
+    batch = []
+    for note in Note.objects.filter(category=category).iterator(chunk_size=500):
+        batch.append(note)
+        if len(batch) == 500:
+            index_notes(batch)
+            batch = []
+    index_notes(batch)
+
+
+def _remove_postings(note_ids):
+    deltas = defaultdict(lambda: [0, 0])
+    existing = SearchPosting.objects.filter(note_id__in=note_ids)
+    counted = set()
+    for note_id, user_id, length in existing.values_list('note_id', 'user_id', 'document_length'):
+        if note_id not in counted:
+            counted.add(note_id)
+            deltas[user_id][0] -= 1
+            deltas[user_id][1] -= length
+    if counted:
+        existing.delete()
+    return deltas
+
+
+def _apply_stats(deltas):
+    for user_id, (documents, length) in deltas.items():
+        if not documents and not length:
+            continue
+        SearchStats.objects.get_or_create(user_id=user_id)
+        SearchStats.objects.filter(user_id=user_id).update(
+            document_count=F('document_count') + documents,
+            total_length=F('total_length') + length,
+        )
+
+
+def parse_query(query):
+    """
+    Split a query into exact terms and an optional trailing prefix term, so
+    that partially typed words still match ("meet" finds "meeting").
+    """
+    terms = tokenize(query)
+    prefix = None
+    if terms and len(terms[-1]) >= MIN_PREFIX_LENGTH and not query[-1:].isspace():
+        prefix = terms.pop()
+    return terms, prefix
+
+
+def search(user, query, limit=50):
+    """
+    Return up to `limit` (note, score) pairs for the user, best match first.
+    """
+    terms, prefix = parse_query(query)
+    if not terms and not prefix:
+        return []
+    stats = SearchStats.objects.filter(user=user).first()
+    if stats is None or stats.document_count <= 0:
+        return []
+
+    conditions = []
+    if terms:
+        conditions.append(Q(term__in=terms))
+    if prefix:
+        conditions.append(Q(term__startswith=prefix))
+    condition = conditions[0] if len(conditions) == 1 else conditions[0] | conditions[1]
+    postings = list(
+        SearchPosting.objects.filter(condition, user=user)
+        .values_list('note_id', 'term', 'frequency', 'document_length')
+    )
+
+    document_frequency = Counter(term for _, term, _, _ in postings)
+    total = stats.document_count
+    average_length = stats.total_length / total or 1
+    scores = defaultdict(float)
+    for note_id, term, frequency, length in postings:
+        df = document_frequency[term]
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * length / average_length)
+        scores[note_id] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+    top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+    notes = Note.objects.in_bulk([note_id for note_id, _ in top])
+    return [(notes[note_id], score) for note_id, score in top if note_id in notes]
+
+
+def highlight(text, query, width=160):
+    """
+    Return an HTML-escaped excerpt of `text` around the first match of the
+    query, with every matching word wrapped in <mark></mark>.
+    """
+    text = text or ''
+    terms, prefix = parse_query(query)
+    patterns = [re.escape(term) + r'\b' for term in terms]
+    if prefix:
+        patterns.append(re.escape(prefix) + r'\w*')
+    if not patterns:
+        return escape(text[:width])
+    matcher = re.compile(r'\b(?:%s)' % '|'.join(patterns), re.IGNORECASE)
+
+    first = matcher.search(text)
+    start = max(0, first.start() - width // 4) if first else 0
+    end = min(len(text), start + width)
+    excerpt = text[start:end]
+
+    parts = []
+    position = 0
+    for match in matcher.finditer(excerpt):
+        parts.append(escape(excerpt[position:match.start()]))
+        parts.append('<mark>%s</mark>' % escape(match.group()))
+        position = match.end()
+    parts.append(escape(excerpt[position:]))
+    return ('...' if start else '') + ''.join(parts) + ('...' if end < len(text) else '')
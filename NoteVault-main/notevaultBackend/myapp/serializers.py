@@ -3,6 +3,23 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Category, Note
+from .instrumentation import timed
+
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer whose output time is reported to request instrumentation."""
+
+    @property
+    def data(self):
+        with timed('serializer'):
+            return super().data
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -11,19 +28,21 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'title', 'user']  
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {
             'user': {'read_only': True}  
         }
 
 
-class NoteSerializer(serializers.ModelSerializer):
+class NoteSerializer(TimedModelSerializer):
     class Meta:
         model = Note
         fields = ['id', 'title', 'content', 'category', 'user','pinned', 'font_size', 'font_style']
+        list_serializer_class = TimedListSerializer
         extra_kwargs = {
             'user':{'read_only':True},
             'pinned':{'default':False}
@@ -2,19 +2,41 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from django.contrib.auth.models import User
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Category, Note
+from .models import Category, Note, Tombstone
 from .serializers import CategorySerializer, NoteSerializer
-from rest_framework.decorators import api_view, permission_classes
+from .pagination import NotePagination, RevisionPagination
+from .conditional import condition_on_collection_version
+from . import bulk, cascade, categories, export, revisions, search, sync
+from .importer import VaultImporter
+from .listing import NoteListQuery
+from .fastjson import LIST_RENDERERS
+from .providers import get_provider
+from .login import HashingBusy, login_throttle
+from .ratelimit import AIRateThrottle, WriteRateThrottle
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.throttling import BaseThrottle
 from rest_framework import status
 from django.contrib.auth.hashers import check_password
-import google.generativeai as genai
 import os
+import json
+import logging
+import zipfile
+from collections.abc import Mapping
 from datetime import datetime
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils.module_loading import import_string
 
+logger = logging.getLogger(__name__)
+
+# Resolved once here rather than by building a TokenObtainPairView per login.
+TokenObtainPairSerializer = import_string(jwt_settings.TOKEN_OBTAIN_SERIALIZER)
 
 
 def index(request):
@@ -30,6 +52,7 @@ def index(request):
     return HttpResponse(html)
 
 @api_view(['POST'])
+@throttle_classes([WriteRateThrottle])
 def register(request):
     data = request.data
     try:
@@ -50,8 +73,35 @@ def register(request):
 
 @api_view(['POST'])
 def login(request):
-    from rest_framework_simplejwt.views import TokenObtainPairView
-    return TokenObtainPairView.as_view()(request._request)
+    """
+    Obtain an access/refresh token pair. Repeated failures for a username
+    or client IP are answered with 429 before any password hashing, and
+    503 means the password hashing pool is saturated (see `myapp.login`).
+    """
+    if not isinstance(request.data, Mapping):
+        return Response({'detail': 'Expected an object with username and password.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    username = request.data.get('username', '')
+    # Honours NUM_PROXIES, like the rate limiter, so clients behind the proxy are told apart.
+    ip = BaseThrottle().get_ident(request)
+    retry_after = login_throttle.retry_after(username, ip)
+    if retry_after:
+        return Response({'detail': 'Too many failed login attempts. Try again later.'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(retry_after)})
+
+    serializer = TokenObtainPairSerializer(data=request.data, context={'request': request})
+    try:
+        serializer.is_valid(raise_exception=True)
+    except AuthenticationFailed:
+        login_throttle.failed(username, ip)
+        raise
+    except HashingBusy:
+        return Response({'detail': 'Login is busy. Try again shortly.'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+    except TokenError as error:
+        raise InvalidToken(error.args[0])
+    login_throttle.succeeded(username, ip)
+    return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -63,12 +113,17 @@ def reset_password(request):
     new_password = data.get('new_password')
     if not current_password or not new_password:
         return Response({'error': 'Both current and new passwords are required'}, status=status.HTTP_400_BAD_REQUEST)
+    # request.user may come from the principal cache; verify against the stored hash.
+    try:
+        user.refresh_from_db(fields=['password'])
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
     if not check_password(current_password, user.password):
         return Response({'error': 'Current password is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
     if current_password == new_password:
         return Response({'error': 'New password cannot be the same as the current password'}, status=status.HTTP_400_BAD_REQUEST)
     user.set_password(new_password)
-    user.save()
+    user.save(update_fields=['password'])
 
     return Response({'message': 'Password reset successfully'}, status=status.HTTP_200_OK)
 
@@ -87,23 +142,24 @@ def profile(request):
     elif request.method == 'PUT':
         data = request.data
         user = request.user
-        email = data.get('email')
-        first_name = data.get('first_name')
-        last_name = data.get('last_name')
-        if email:
-            user.email = email
-        if first_name:
-            user.first_name = first_name
-        if last_name:
-            user.last_name = last_name
-
-        user.save()
+        changed = [field for field in ('email', 'first_name', 'last_name') if data.get(field)]
+        for field in changed:
+            setattr(user, field, data.get(field))
+
+        # request.user may come from the principal cache: write only these columns.
+        if changed:
+            try:
+                with transaction.atomic():
+                    user.save(update_fields=changed)
+            except DatabaseError:  # the account was deleted meanwhile
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'Email updated successfully'}, status=status.HTTP_200_OK)
     return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)   
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def create_category(request):
     serializer = CategorySerializer(data=request.data)
 
@@ -114,30 +170,33 @@ def create_category(request):
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def edit_category(request, category_id):
     try:
-        print("cat", category_id)
         category = Category.objects.get(id=category_id)
-        print("cat", category)
     except Category.DoesNotExist:
         return Response({"detail": "Category not found."}, status=status.HTTP_404_NOT_FOUND)
     if category.user != request.user:
         return Response({"detail": "You are not authorized to edit this category."}, status=status.HTTP_403_FORBIDDEN)
+    old_title = category.title
     serializer = CategorySerializer(category, data=request.data)
     if serializer.is_valid():
         serializer.save()
+        if category.title != old_title:
+            search.reindex_category(category)
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
+@renderer_classes(LIST_RENDERERS)
 @permission_classes([IsAuthenticated])
+@condition_on_collection_version
 def get_categories(request):
-    categories = Category.objects.filter(user=request.user)
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data)
+    return Response(categories.user_categories(request.user.id))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def create_note(request):
     title = request.data.get('title')
     content = request.data.get('content')
@@ -149,26 +208,36 @@ def create_note(request):
     if not title or not content or not category_id:
         return Response({'error': 'All fields are required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        category = Category.objects.get(id=category_id, user=request.user)
-    except Category.DoesNotExist:
+    if not categories.owns_category(request.user.id, category_id):
         return Response({'error': 'Invalid category'}, status=status.HTTP_400_BAD_REQUEST)
 
-    note = Note.objects.create(
+    note = Note(
         title=title,
         content=content,
-        category=category,
+        category_id=int(category_id),
         user=request.user,
         pinned=bool(pinned),
-        font_size=font_size,
-        font_style=font_style
     )
+    # Fall back to the model defaults when the client leaves the font unset.
+    if font_size is not None:
+        note.font_size = font_size
+    if font_style:
+        note.font_style = font_style
+    try:
+        # The note, its postings and its first revision are written together.
+        with transaction.atomic():
+            note.save()
+            search.index_notes([note])
+            revisions.record([note])
+    except IntegrityError:  # the category was deleted since the cached check
+        return Response({'error': 'Invalid category'}, status=status.HTTP_400_BAD_REQUEST)
     serializer = NoteSerializer(note)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def toggle_pin(request, note_id):
     try:
         note = Note.objects.get(id=note_id, user=request.user)
@@ -181,26 +250,81 @@ def toggle_pin(request, note_id):
 
 
 @api_view(['GET'])
+@renderer_classes(LIST_RENDERERS)
 @permission_classes([IsAuthenticated])
+@condition_on_collection_version
 def get_notes(request):
-    notes = Note.objects.filter(user=request.user).order_by('-pinned')
-    serializer = NoteSerializer(notes, many=True)
-    return Response(serializer.data)
+    """
+    List the user's notes. Supports filtering, sorting, field selection and
+    content previews (see `myapp.listing`) and keyset pagination.
+    """
+    try:
+        query = NoteListQuery(request.query_params)
+    except ValueError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    notes = query.apply(Note.objects.filter(user=request.user))
+    paginator = NotePagination(query.ordering)
+    page = paginator.paginate_queryset(notes, request)
+    if page is not None:
+        return paginator.get_paginated_response(query.represent(page))
+    return Response(query.represent(notes))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
+def bulk_notes(request):
+    """
+    Apply a batch of note operations in one transaction.
+    Body: `{"operations": [{"op": "create" | "update" | "pin" | "move" | "delete", ...}]}`
+    (see `myapp.bulk` for the fields of each operation). Either every
+    operation is applied or, if any is invalid, none is and the errors are
+    returned by operation index.
+    """
+    operations = request.data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return Response({'error': '`operations` must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(operations) > settings.BULK_MAX_OPERATIONS:
+        return Response({'error': f'At most {settings.BULK_MAX_OPERATIONS} operations are allowed per request'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        applied = bulk.apply_operations(request.user, operations)
+    except bulk.BulkValidationError as exc:
+        return Response({'error': 'No operations were applied', 'errors': exc.errors},
+                        status=status.HTTP_400_BAD_REQUEST)
+    results = []
+    for index, op, target in applied:
+        if op == 'delete':
+            results.append({'index': index, 'op': op, 'id': target})
+        else:
+            results.append({'index': index, 'op': op, 'id': target.id, 'note': NoteSerializer(target).data})
+    return Response({'results': results}, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
+@renderer_classes(LIST_RENDERERS)
 @permission_classes([IsAuthenticated])
+@condition_on_collection_version
 def get_notes_by_category(request, category_id):
+    """Notes of one category; accepts the same query parameters as `get_notes`."""
     try:
         category = Category.objects.get(id=category_id, user=request.user)
-        notes = Note.objects.filter(category=category, user=request.user).order_by('-pinned')
-        serializer = NoteSerializer(notes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
     except Category.DoesNotExist:
         return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        query = NoteListQuery(request.query_params)
+    except ValueError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    notes = query.apply(Note.objects.filter(category=category, user=request.user))
+    paginator = NotePagination(query.ordering)
+    page = paginator.paginate_queryset(notes, request)
+    if page is not None:
+        return paginator.get_paginated_response(query.represent(page))
+    return Response(query.represent(notes))
     
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@condition_on_collection_version(
+    exists=lambda request, note_id: Note.objects.filter(id=note_id, user=request.user).exists())
 def get_note(request, note_id):
     try:
         note = Note.objects.get(id=note_id, user=request.user)
@@ -213,70 +337,182 @@ def get_note(request, note_id):
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def update_note(request, note_id):
-    print("data", request.data)
     try:
         note = Note.objects.get(id=note_id, user=request.user)
     except Note.DoesNotExist:
         return Response({'message': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
+    previous = {note.pk: note.content}
     serializer = NoteSerializer(note, data=request.data, partial=True)
     if serializer.is_valid():
-        serializer.save()
-        print("updated", serializer.data)
+        with transaction.atomic():
+            serializer.save()
+            search.index_notes([note])
+            revisions.record([note], previous)
+        logger.debug('Updated note %s', note_id)
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def note_revisions(request, note_id):
+    """Saved versions of a note, newest first and keyset-paginated (see `myapp.revisions`)."""
+    if not Note.objects.filter(id=note_id, user=request.user).exists():
+        return Response({'message': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
+    paginator = RevisionPagination()
+    page = paginator.paginate_queryset(revisions.list_revisions(note_id), request)
+    return paginator.get_paginated_response(page)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def note_revision(request, note_id, number):
+    """One saved version of a note with its full content."""
+    if not Note.objects.filter(id=note_id, user=request.user).exists():
+        return Response({'message': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
+    revision = revisions.get_revision(note_id, number)
+    if revision is None:
+        return Response({'message': 'Revision not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(revision)
+
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def delete_note(request, note_id):
     try:
         note = Note.objects.get(id=note_id, user=request.user)
     except Note.DoesNotExist:
         return Response({'message': 'Note not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    note.delete()
+    with transaction.atomic():
+        search.remove_notes([note.id])
+        sync.record_deletions(request.user.id, Tombstone.NOTE, [note.id])
+        note.delete()
     return Response({'message': 'Note deleted successfully'}, status=status.HTTP_200_OK)
 
 @api_view(['DELETE'])
 
 @permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
 def delete_category(request, category_id):
-
+    """
+    Delete a category and all of its notes, in chunks (see `myapp.cascade`).
+    With `?progress=1` one NDJSON progress line is streamed per chunk, the
+    last one with `"done": true`.
+    """
     try:
         category = Category.objects.get(id=category_id, user=request.user)
-
     except Category.DoesNotExist:
         return Response({'message': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
-    notes = Note.objects.filter(category=category) 
 
-    notes.delete()
-    category.delete()
-    return Response({'message': 'Category and associated notes deleted successfully'}, status=status.HTTP_200_OK)
+    progress = cascade.delete_category(category)
+    if request.query_params.get('progress'):
+        return StreamingHttpResponse((json.dumps(line) + '\n' for line in progress),
+                                     content_type='application/x-ndjson')
+    for line in progress:
+        pass
+    return Response({'message': 'Category and associated notes deleted successfully',
+                     'notes_deleted': line['deleted']}, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def search_notes(request):
     """
-    Search notes by title or category.
+    Full-text search over notes, ranked by relevance (BM25).
     Query parameters:
-    - `q`: Search query (matches title or category name).
+    - `q`: Search query (matches title, content or category name; the last
+      word also matches as a prefix).
+    - `limit`: Maximum number of results (default 50).
+    Each result is a note with an extra `score` and an HTML `snippet` in
+    which matching words are wrapped in <mark></mark>.
     """
     query = request.query_params.get('q', None)
     if not query:
         return Response({'error': 'Search query parameter `q` is required'}, status=status.HTTP_400_BAD_REQUEST)
-    notes = Note.objects.filter(user=request.user)
-    filtered_notes = notes.filter(
-        title__icontains=query
-    ) | notes.filter(
-        category__title__icontains=query
-    )
-    serializer = NoteSerializer(filtered_notes, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 50)), 200))
+    except ValueError:
+        return Response({'error': '`limit` must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    results = search.search(request.user, query, limit=limit)
+    data = []
+    for note, score in results:
+        item = NoteSerializer(note).data
+        item['score'] = round(score, 4)
+        item['snippet'] = search.highlight(note.content, query)
+        data.append(item)
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    """
+    Notes and categories changed since a change sequence number.
+    Query parameters:
+    - `since`: The `seq` returned by the previous call (0 for a full sync).
+    - `limit`: Maximum number of changes to return (default 500). When
+      `more` is true, call again with the returned `seq`.
+    """
+    try:
+        since = int(request.query_params.get('since', 0))
+        limit = max(1, min(int(request.query_params.get('limit', 500)), 1000))
+    except ValueError:
+        return Response({'error': '`since` and `limit` must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(sync.changes_since(request.user, since, limit), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_vault(request):
+    """
+    Download every category and note of the user as a stream.
+    Query parameters:
+    - `output`: `ndjson` (default) for one JSON record per line, or `zip`
+      for a zip archive of Markdown files.
+    """
+    output = request.query_params.get('output', 'ndjson')
+    if output == 'ndjson':
+        response = StreamingHttpResponse(export.stream_ndjson(request.user), content_type='application/x-ndjson')
+        filename = 'notevault-export.ndjson'
+    elif output == 'zip':
+        response = StreamingHttpResponse(export.stream_markdown_zip(request.user), content_type='application/zip')
+        filename = 'notevault-export.zip'
+    else:
+        return Response({'error': '`output` must be `ndjson` or `zip`'}, status=status.HTTP_400_BAD_REQUEST)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 @api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([WriteRateThrottle])
+def import_vault(request):
+    """
+    Import notes from an upload, streaming back one NDJSON progress line
+    per written batch and a final line with `"done": true`.
+    Accepts either a multipart upload in the `file` field (NDJSON as
+    produced by `/export/`, or a zip of Markdown files), or a raw NDJSON
+    request body sent with `Content-Type: application/x-ndjson`.
+    """
+    importer = VaultImporter(request.user)
+    if request.content_type.startswith('application/x-ndjson'):
+        # Read the body line by line straight from the request stream.
+        progress = importer.run_ndjson(request._request)
+    else:
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload a file in the `file` field'}, status=status.HTTP_400_BAD_REQUEST)
+        is_zip = zipfile.is_zipfile(upload)
+        upload.seek(0)
+        progress = importer.run_markdown_zip(upload) if is_zip else importer.run_ndjson(upload)
+    return StreamingHttpResponse((json.dumps(line) + '\n' for line in progress),
+                                 content_type='application/x-ndjson')
+
+
+@api_view(['POST'])
+@throttle_classes([WriteRateThrottle])
 def reset_new_password(request):
-    print("data", request.data)
     data = request.data
     username = data.get('username')
     email = data.get('email')
@@ -308,76 +544,24 @@ def reset_new_password(request):
     return Response({'message': 'Password reset successfully'}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
+@throttle_classes([AIRateThrottle])
 def summarize_text(request):
-    KEY = settings.KEY
     original_text = request.data.get('text')
     if not original_text or not isinstance(original_text, str) or len(original_text.strip()) == 0:
         return Response({'error': 'Input text is empty or invalid.'}, status=status.HTTP_400_BAD_REQUEST)
-    genai.configure(api_key=KEY)
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    analysis_response = model.generate_content(
-        f"Does the following text convey meaning, even if it contains grammar or spelling errors? Answer 'yes' or 'no': {original_text}"
-    )
-    if "no" in analysis_response.text.lower():
-        correction_check = model.generate_content(
-            f"Can the following text be corrected to make sense? Answer 'yes' or 'no': {original_text}"
-        )
-        if "no" in correction_check.text.lower():
-            return Response(
-                {'message': 'The provided text cannot be summarized meaningfully. Please provide coherent text.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    if " I " in original_text or original_text.lower().startswith("i "):
-        summary_prompt = (
-            f"Act as a professional summarizer. Retain the first-person perspective while condensing: {original_text}"
-        )
-    else:
-        summary_prompt = (
-            f"Act as a professional summarizer. Condense the following text while retaining its essence and correcting grammar and spelling: {original_text}"
-        )
-
-    response = model.generate_content(summary_prompt)
-    summary = response.text.strip()
-    if not summary or summary.lower() == original_text.lower() or len(summary) < 3:
-        return Response(
-            {'message': 'The summarization failed to produce meaningful output. Please provide valid and coherent text.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    return Response({'summary': summary}, status=status.HTTP_200_OK)
+    data, code = get_provider().run('summarize', original_text)
+    return Response(data, status=code)
 
 
 
 @api_view(['POST'])
+@throttle_classes([AIRateThrottle])
 def check_text(request):
-    KEY = settings.KEY
     original_text = request.data.get('text') 
     if not original_text or not isinstance(original_text, str) or len(original_text.strip()) == 0:
         return Response({'error': 'Input text is empty or invalid.'}, status=status.HTTP_400_BAD_REQUEST)
-    genai.configure(api_key=KEY)
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    sense_check_response = model.generate_content(f"Does this text make sense? Answer 'yes' or 'no': {original_text}")
-    if "no" in sense_check_response.text.lower():
-        grammar_check_response = model.generate_content(f"Can this text be corrected to make sense? Answer 'yes' or 'no': {original_text}")
-        if "no" in grammar_check_response.text.lower():
-            return Response(
-                {'message': 'The provided text is nonsensical or invalid. Please provide meaningful input.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    correctness_response = model.generate_content(f"Is this text grammatically and punctually correct? Answer 'yes' or 'no': {original_text}")
-    if "yes" in correctness_response.text.lower():
-        return Response(
-            {'message': 'No fix required!'},
-            status=status.HTTP_200_OK
-        )
-    correction_response = model.generate_content(f"Correct grammar, punctuation, and spelling: {original_text}")
-    corrected_text = correction_response.text.strip()
-    if not corrected_text.endswith("."):
-        corrected_text += "."
-
-    return Response(
-        {'correctedText': corrected_text},
-        status=status.HTTP_200_OK
-    )
+    data, code = get_provider().run('check', original_text)
+    return Response(data, status=code)
 
 @api_view(['GET'])
 def get_firstname(request):
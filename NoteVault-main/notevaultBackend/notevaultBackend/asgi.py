@@ -2,6 +2,8 @@
 ASGI config for notevaultBackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn notevaultBackend.asgi:application``)
+to get the non-blocking AI endpoints in ``myapp.async_views``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
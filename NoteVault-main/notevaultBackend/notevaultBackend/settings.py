@@ -44,9 +44,12 @@ INSTALLED_APPS = [
     'myapp',
     'corsheaders',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
 ]
 
 MIDDLEWARE = [
+    'myapp.instrumentation.RequestTimingMiddleware',
+    'myapp.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -59,6 +62,36 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'notevaultBackend.urls'
 
+# Per-request DB/serializer/external-call timings as Server-Timing headers
+# and JSON log lines on the myapp.timing logger. Off by default.
+REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+# Prometheus metrics served at /metrics. With several worker processes, point
+# METRICS_MULTIPROC_DIR at a directory shared by them (emptied on deploy);
+# each worker writes a snapshot there every METRICS_FLUSH_INTERVAL seconds.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# /metrics answers only requests with `Authorization: Bearer <METRICS_TOKEN>`
+# or from clients in these networks (comma-separated, CIDR allowed; none by
+# default). Client addresses honour REST_FRAMEWORK['NUM_PROXIES'].
+METRICS_ALLOWED_NETWORKS = [
+    network.strip() for network in os.getenv('METRICS_ALLOWED_NETWORKS', '').split(',') if network.strip()
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'myapp.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'myapp': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO')},
+    },
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -79,18 +112,110 @@ WSGI_APPLICATION = 'notevaultBackend.wsgi.application'
 
 KEY = os.getenv('API_KEY')
 
-# Database
+AI_MODEL = os.getenv('AI_MODEL', 'gemini-1.5-flash')
+
+# Text-intelligence provider for summarize/check_grammar, built once at
+# startup. myapp.providers.LocalProvider works offline; setting it as the
+# fallback switches to it whenever the primary errors or takes longer than
+# AI_FAILOVER_TIMEOUT seconds.
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'myapp.providers.GeminiProvider')
+AI_FALLBACK_PROVIDER = os.getenv('AI_FALLBACK_PROVIDER') or None
+AI_FAILOVER_TIMEOUT = float(os.getenv('AI_FAILOVER_TIMEOUT', 10))
+
+# "structured" gets every grammar-check verdict from one JSON call,
+# "chain" uses the original sequence of yes/no prompts.
+CHECK_TEXT_PIPELINE = os.getenv('CHECK_TEXT_PIPELINE', 'structured')
+
+# Limits for the async AI views: in-flight model calls per event loop and
+# seconds allowed per call.
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 8))
+AI_CALL_TIMEOUT = float(os.getenv('AI_CALL_TIMEOUT', 30))
+
+# Content-addressed cache for summarize/check_grammar responses. Set
+# SHARED_ALIAS to a name from CACHES to share entries between workers.
+AI_CACHE = {
+    'MAXSIZE': int(os.getenv('AI_CACHE_MAXSIZE', 1024)),
+    'TTL': int(os.getenv('AI_CACHE_TTL', 24 * 60 * 60)),
+    'SHARED_ALIAS': os.getenv('AI_CACHE_SHARED_ALIAS') or None,
+}
+
+# Per-user category lists, renewed whenever one of the user's categories is
+# saved or deleted. With several workers set SHARED_ALIAS, so all of them see
+# the change at once; otherwise other workers notice within TTL seconds.
+CATEGORY_CACHE = {
+    'MAXSIZE': int(os.getenv('CATEGORY_CACHE_MAXSIZE', 10000)),
+    'TTL': int(os.getenv('CATEGORY_CACHE_TTL', 300)),
+    'SHARED_ALIAS': os.getenv('CATEGORY_CACHE_SHARED_ALIAS') or None,
+}
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'djongo',
-        'NAME': 'NoteVault',
-        'CLIENT': {
-            'host': os.getenv('DATABASE_URL'),
-            'ssl': True,  
+# Users resolved from access tokens are cached for TTL seconds. Saving or
+# deleting a user renews its entry's generation in the shared tier, so with
+# SHARED_ALIAS every worker misses at once; without it other workers' local
+# copies live at most LOCAL_TTL seconds.
+PRINCIPAL_CACHE = {
+    'MAXSIZE': int(os.getenv('PRINCIPAL_CACHE_MAXSIZE', 10000)),
+    'TTL': int(os.getenv('PRINCIPAL_CACHE_TTL', 60)),
+    'LOCAL_TTL': int(os.getenv('PRINCIPAL_CACHE_LOCAL_TTL', 30)),
+    'SHARED_ALIAS': os.getenv('PRINCIPAL_CACHE_SHARED_ALIAS') or None,
+}
+
+# Database
+# DATABASE_URL picks the backend: a mongodb:// or mongodb+srv:// URL keeps
+# the djongo setup, anything else (postgres://..., sqlite:///...) is parsed
+# by dj-database-url. Without it a local SQLite file is used.
+
+DATABASE_URL = os.getenv('DATABASE_URL', '')
+
+# Connection reuse. Connections persist for DB_CONN_MAX_AGE seconds, so
+# requests don't pay a (TLS) handshake, and are checked before reuse.
+# Mongo: each persistent MongoClient keeps a pool of DB_MIN_POOL_SIZE to
+# DB_MAX_POOL_SIZE sockets, closing idle ones after DB_MAX_IDLE_TIME seconds.
+# PostgreSQL: DB_POOL=1 switches to psycopg's pool with the same sizes.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', '1').lower() in ('1', 'true', 'yes')
+DB_MIN_POOL_SIZE = int(os.getenv('DB_MIN_POOL_SIZE', '1'))
+DB_MAX_POOL_SIZE = int(os.getenv('DB_MAX_POOL_SIZE', '20'))
+DB_MAX_IDLE_TIME = float(os.getenv('DB_MAX_IDLE_TIME', '300'))
+DB_SERVER_SELECTION_TIMEOUT = float(os.getenv('DB_SERVER_SELECTION_TIMEOUT', '5'))
+DB_POOL = os.getenv('DB_POOL', '').lower() in ('1', 'true', 'yes')
+
+if DATABASE_URL.startswith(('mongodb://', 'mongodb+srv://')):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'djongo',
+            'NAME': os.getenv('DATABASE_NAME', 'NoteVault'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'CLIENT': {
+                'host': DATABASE_URL,
+                'ssl': True,
+                'minPoolSize': DB_MIN_POOL_SIZE,
+                'maxPoolSize': DB_MAX_POOL_SIZE,
+                'maxIdleTimeMS': int(DB_MAX_IDLE_TIME * 1000),
+                'serverSelectionTimeoutMS': int(DB_SERVER_SELECTION_TIMEOUT * 1000),
+            }
         }
     }
-}
+else:
+    import dj_database_url
+
+    DATABASES = {
+        'default': dj_database_url.parse(
+            DATABASE_URL or 'sqlite:///' + str(BASE_DIR / 'db.sqlite3'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        ),
+    }
+    if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        # Django's pool replaces persistent connections (requires psycopg[pool]).
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        # Added to the URL's own options (e.g. ?sslmode=require), not instead of them.
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_MIN_POOL_SIZE,
+            'max_size': DB_MAX_POOL_SIZE,
+            'max_idle': DB_MAX_IDLE_TIME,
+            'timeout': DB_SERVER_SELECTION_TIMEOUT,
+        }
 
 CORS_ALLOW_CREDENTIALS = True
 
@@ -156,15 +281,89 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'myapp.authentication.CachedJWTAuthentication',
     ),
+    # Reverse proxies in front of the app (e.g. 1 behind nginx), so client IPs
+    # for rate limits and login throttling come from X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES')) if os.getenv('NUM_PROXIES') else None,
+}
+
+# Keyset pagination for the note list endpoints (opt-in via ?page_size= or ?cursor=)
+NOTES_PAGE_SIZE = int(os.getenv('NOTES_PAGE_SIZE', 50))
+NOTES_MAX_PAGE_SIZE = int(os.getenv('NOTES_MAX_PAGE_SIZE', 200))
+
+# Content previews on the note list (?preview=<n>, or `preview` in ?fields=)
+NOTES_PREVIEW_LENGTH = int(os.getenv('NOTES_PREVIEW_LENGTH', 200))
+NOTES_MAX_PREVIEW_LENGTH = int(os.getenv('NOTES_MAX_PREVIEW_LENGTH', 2000))
+
+# Notes deleted per transaction when a category is deleted
+CATEGORY_DELETE_CHUNK_SIZE = int(os.getenv('CATEGORY_DELETE_CHUNK_SIZE', 1000))
+
+# Every NOTE_REVISION_SNAPSHOT_INTERVAL-th note revision stores the full
+# content; the ones in between store deltas (myapp.revisions)
+NOTE_REVISION_SNAPSHOT_INTERVAL = int(os.getenv('NOTE_REVISION_SNAPSHOT_INTERVAL', 20))
+
+# Upper bound on operations accepted by /notes/bulk/ in one request
+BULK_MAX_OPERATIONS = int(os.getenv('BULK_MAX_OPERATIONS', 1000))
+
+# Notes written per bulk_create batch by /import/
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 500))
+
+# Largest file accepted per note from an imported zip (decompressed size)
+IMPORT_MAX_NOTE_BYTES = int(os.getenv('IMPORT_MAX_NOTE_BYTES', 1024 * 1024))
+
+# Token buckets per client (user, else IP) for the AI and write endpoints:
+# BURST requests at once, refilled at PER_MINUTE (BURST >= 1 and PER_MINUTE
+# > 0, see `manage.py check`). Set STORE to a SQLite file path to share the
+# buckets between the workers of a host.
+RATE_LIMITS = {
+    'ENABLED': os.getenv('RATE_LIMIT_ENABLED', '1').lower() in ('1', 'true', 'yes'),
+    'STORE': os.getenv('RATE_LIMIT_STORE', ''),
+    'SCOPES': {
+        'ai': {
+            'BURST': int(os.getenv('RATE_LIMIT_AI_BURST', 10)),
+            'PER_MINUTE': float(os.getenv('RATE_LIMIT_AI_PER_MINUTE', 10)),
+        },
+        'write': {
+            'BURST': int(os.getenv('RATE_LIMIT_WRITE_BURST', 60)),
+            'PER_MINUTE': float(os.getenv('RATE_LIMIT_WRITE_PER_MINUTE', 120)),
+        },
+    },
 }
 
 from datetime import timedelta
 
+# Password checks run on a bounded pool (myapp.login); when LOGIN_HASH_WORKERS
+# threads are busy and LOGIN_HASH_QUEUE logins wait, further logins get 503.
+AUTHENTICATION_BACKENDS = ['myapp.login.PooledModelBackend']
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', os.cpu_count() or 2))
+LOGIN_HASH_QUEUE = int(os.getenv('LOGIN_HASH_QUEUE', 32))
+
+# Failed logins allowed per username and per client IP within WINDOW seconds
+# before /login/ answers 429. Set SHARED_ALIAS to count across workers.
+LOGIN_THROTTLE = {
+    'USERNAME_LIMIT': int(os.getenv('LOGIN_USERNAME_FAILURE_LIMIT', 5)),
+    'IP_LIMIT': int(os.getenv('LOGIN_IP_FAILURE_LIMIT', 50)),
+    'WINDOW': int(os.getenv('LOGIN_FAILURE_WINDOW', 15 * 60)),
+    'SHARED_ALIAS': os.getenv('LOGIN_THROTTLE_SHARED_ALIAS') or None,
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'myapp.blacklist.TokenRefreshSerializer',
+}
+
+# Bloom filter in front of the refresh-token blacklist (myapp.blacklist).
+# A background thread adds newly blacklisted tokens every SYNC_INTERVAL
+# seconds and rebuilds the filter, pruning expired tokens, every
+# REBUILD_INTERVAL seconds.
+TOKEN_BLACKLIST_FILTER = {
+    'CAPACITY': int(os.getenv('TOKEN_BLACKLIST_CAPACITY', 1000000)),
+    'ERROR_RATE': float(os.getenv('TOKEN_BLACKLIST_ERROR_RATE', 0.001)),
+    'SYNC_INTERVAL': float(os.getenv('TOKEN_BLACKLIST_SYNC_INTERVAL', 5)),
+    'REBUILD_INTERVAL': float(os.getenv('TOKEN_BLACKLIST_REBUILD_INTERVAL', 60 * 60)),
+    'BACKGROUND': True,
 }
@@ -1,5 +1,5 @@
 from django.urls import path
-from myapp import views
+from myapp import async_views, metrics, views
 from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
@@ -13,16 +13,25 @@ urlpatterns = [
     path('categories/create/', views.create_category, name='create_category'),
     path('notes/', views.get_notes, name='get_notes'),              
     path('notes/create/', views.create_note, name='create_note'),    
+    path('notes/bulk/', views.bulk_notes, name='bulk_notes'),
     path('notes/category/<int:category_id>/', views.get_notes_by_category, name='notes_by_category'), 
     path('notes/<int:note_id>/', views.get_note, name='get_note'),   
     path('notes/update/<int:note_id>/', views.update_note, name='update_note'),  
+    path('notes/<int:note_id>/revisions/', views.note_revisions, name='note_revisions'),
+    path('notes/<int:note_id>/revisions/<int:number>/', views.note_revision, name='note_revision'),
     path('notes/delete/<int:note_id>/', views.delete_note, name='delete_note'),  
     path('notes/search/', views.search_notes, name='search_notes'), 
     path('categories/update/<int:category_id>/', views.edit_category, name='edit_category'),
     path('categories/delete/<int:category_id>/', views.delete_category, name='delete_category'),
     path('notes/toggle-pin/<int:note_id>/', views.toggle_pin, name='toggle_pin'),  
+    path('sync/', views.sync_changes, name='sync'),
+    path('export/', views.export_vault, name='export'),
+    path('import/', views.import_vault, name='import'),
     path('reset-new-password/', views.reset_new_password, name='reset_new_password'),
     path('summarize/', views.summarize_text, name='summarize'),
     path('check_grammar/', views.check_text, name='check_grammar'),
+    path('summarize/async/', async_views.summarize_text, name='summarize_async'),
+    path('check_grammar/async/', async_views.check_text, name='check_grammar_async'),
     path('api/getFirstname/', views.get_firstname, name='get_firstname'),
+    path('metrics', metrics.metrics_view, name='metrics'),
 ]